@@ -70,6 +70,30 @@ class ArboristTests(TestBase):
         self.assertIn('"text": "SW48_MAPPED"', self.study.concept_tree.jstree.json_data_string)
         self.assertEqual(1, len(self.study.Clinical.WordMapping.word_map_changes(silent=True)))
 
+    def test_changes_without_load(self):
+        study = create_study_from_dir('valid_study')
+        word_mapping = study.Clinical.WordMapping
+        self.assertFalse(word_mapping.df_is_loaded)
+        self.assertEqual({}, word_mapping.word_map_changes(silent=True))
+
+        var_id = list(word_mapping.word_map_dicts)[0]
+        old_map = word_mapping.get_word_map(var_id)
+        word_mapping.set_word_map(var_id, {})
+        self.assertEqual({var_id: old_map}, word_mapping.word_map_changes(silent=True))
+
+    def test_changes_numeric_word_map(self):
+        study = create_study_from_dir('valid_study')
+        word_mapping = study.Clinical.WordMapping
+        old_maps = word_mapping.word_map_dicts
+        var_id = ('Cell-line_clinical.txt', 5)
+        new_maps = {old_var_id: {} for old_var_id in old_maps}
+        new_maps[var_id] = {1: 'One'}
+        word_mapping.set_word_maps(new_maps)
+
+        changes = word_mapping.word_map_changes(silent=True)
+        self.assertEqual(changes.pop(var_id), {1: 'One'})
+        self.assertEqual(set(changes), set(old_maps))
+
     def test_changes_column_mapping(self):
         json_data = self.json_data.replace('"text": "Characteristics"', '"text": "Characteristic"')
 
@@ -35,3 +35,74 @@ class BlueprintTests(TestBase):
         tmtk.arborist.update_study_from_json(self.study, json_data)
         self.assertIn('\\Demographics\\_info\\+\\_mation\\+other',
                       self.study.Clinical.ColumnMapping.df['Category Code'][1])
+
+    def test_column_mapping_row_cache(self):
+        study = tmtk.Study()
+        study.Clinical.add_datafile(os.path.join(self.studies_dir, 'blueprinted', 'datafile.tsv'))
+        var = study.Clinical.get_variable(('datafile.tsv', 2))
+        self.assertIs(var, study.Clinical.get_variable(('datafile.tsv', 2)))
+
+        var.data_label = 'New label'
+        var.concept_code = 'CODE'
+        self.assertEqual(var.data_label, 'New label')
+        self.assertEqual(var.concept_code, 'CODE')
+        self.assertEqual(list(study.Clinical.ColumnMapping.df.loc[('datafile.tsv', 2)]),
+                         study.Clinical.ColumnMapping.select_row(var.var_id))
+
+        study.Clinical.ColumnMapping.df.iloc[1, 3] = 'Changed in place'
+        self.assertEqual(var.data_label, 'Changed in place')
+        self.assertIn(var.var_id, study.Clinical.ColumnMapping.ids_by_label('Changed in place'))
+
+    def test_keyword_index(self):
+        study = tmtk.Study()
+        study.Clinical.add_datafile(os.path.join(self.studies_dir, 'blueprinted', 'datafile.tsv'))
+        modifier = study.Clinical.get_variable(('datafile.tsv', 2))
+        self.assertEqual(study.Clinical.get_variable(('datafile.tsv', 3)).modifiers, [])
+
+        modifier.data_label = 'MODIFIER'
+        self.assertEqual(study.Clinical.find_variables_by_label('MODIFIER'), [modifier])
+        self.assertEqual(study.Clinical.get_variable(('datafile.tsv', 1)).modifiers, [modifier])
+
+        modifier.reference_column = '3,4'
+        self.assertEqual(study.Clinical.get_variable(('datafile.tsv', 1)).modifiers, [])
+        self.assertEqual(study.Clinical.get_variable(('datafile.tsv', 3)).modifiers, [modifier])
+
+        column_mapping = study.Clinical.ColumnMapping
+        column_mapping.df.iloc[:, 4] = ''
+        self.assertEqual(study.Clinical.get_variable(('datafile.tsv', 1)).modifiers, [modifier])
+        column_mapping.df.iloc[1, 3] = 'Changed in place'
+        self.assertEqual(study.Clinical.find_variables_by_label('MODIFIER'), [])
+        self.assertEqual(study.Clinical.get_variable(('datafile.tsv', 1)).modifiers, [])
+
+    def test_invalid_blueprint_changes_nothing(self):
+        study = tmtk.Study()
+        study.Clinical.add_datafile(os.path.join(self.studies_dir, 'blueprinted', 'datafile.tsv'))
+        column_mapping = study.Clinical.ColumnMapping.df.copy()
+        header = study.Clinical.get_variable(('datafile.tsv', 2)).header
+        blueprint = {header: {'label': 'Changed', 'reference_column': 'not a column'}}
+
+        with self.assertRaises(tmtk.utils.BlueprintException):
+            study.Clinical.apply_blueprint(blueprint)
+        self.assertTrue(column_mapping.equals(study.Clinical.ColumnMapping.df))
+
+    def test_set_word_maps(self):
+        study = tmtk.Study()
+        study.Clinical.add_datafile(os.path.join(self.studies_dir, 'blueprinted', 'datafile.tsv'))
+        word_mapping = study.Clinical.WordMapping
+        word_mapping.set_word_maps({('datafile.tsv', 2): {'M': 'Male', 'F': 'Female'},
+                                    ('datafile.tsv', 3): {'x': 'y'}})
+        self.assertEqual(word_mapping.get_word_map(('datafile.tsv', 2)), {'M': 'Male', 'F': 'Female'})
+        self.assertEqual(word_mapping.df.shape, (3, 4))
+
+        gender = study.Clinical.get_variable(('datafile.tsv', 2))
+        self.assertTrue(gender.is_in_wordmap)
+        self.assertEqual(set(gender.mapped_values), {'Male', 'Female'})
+        self.assertEqual(study.Clinical.get_variable(('datafile.tsv', 3)).word_mapped_not_present(), {'x'})
+
+        word_mapping.set_word_maps({('datafile.tsv', 3): {}})
+        self.assertEqual(list(word_mapping.df.index), [('datafile.tsv', 2)] * 2)
+        self.assertEqual(word_mapping.get_word_map(('datafile.tsv', 3)), {})
+
+        word_mapping.df.iloc[0, 3] = 'Changed in place'
+        self.assertIn('Changed in place', word_mapping.get_word_map(('datafile.tsv', 2)).values())
+        self.assertIn('Changed in place', set(gender.mapped_values))
@@ -1,11 +1,16 @@
 import unittest
 
+import atexit
 import os
 import shutil
 import tempfile
 
 import tmtk
 
+# Keep cache files written during tests out of the home directory.
+tmtk.options.cache_dir = tempfile.mkdtemp(prefix='tmtk_cache_')
+atexit.register(shutil.rmtree, tmtk.options.cache_dir, ignore_errors=True)
+
 
 def create_study_from_dir(dir_name):
     return tmtk.Study(os.path.join(TestBase.studies_dir, dir_name, 'study.params'))
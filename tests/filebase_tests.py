@@ -0,0 +1,191 @@
+import os
+import glob
+import shutil
+import pandas as pd
+
+from tests.commons import TestBase
+from tmtk import options
+from tmtk.clinical import DataFile
+from tmtk.utils import (clear_df_cache, evict_df_cache, df2file, Mappings, PathError, path_converter,
+                        convert_paths, as_numeric)
+
+
+class FileBaseTests(TestBase):
+
+    @classmethod
+    def setup_class_hook(cls):
+        cls.cache_dir = os.path.join(cls.temp_dir, 'cache')
+        cls.data_path = os.path.join(cls.temp_dir, 'data.tsv')
+        shutil.copy(os.path.join(cls.studies_dir, 'valid_study', 'clinical', 'Cell-line_clinical.txt'),
+                    cls.data_path)
+
+    def setUp(self):
+        self._default_cache_dir = options.cache_dir
+        options.cache_dir = self.cache_dir
+        options.cache_dataframes = True
+
+    def tearDown(self):
+        clear_df_cache()
+        options.cache_dir = self._default_cache_dir
+        options.cache_dataframes = False
+
+    def cache_files(self):
+        return glob.glob(os.path.join(self.cache_dir, '*.pkl'))
+
+    def test_df_cache(self):
+        df = DataFile(self.data_path).df
+        self.assertEqual(len(self.cache_files()), 1)
+
+        cached_df = DataFile(self.data_path).df
+        self.assertTrue(df.equals(cached_df))
+
+    def test_df_cache_invalidated(self):
+        data_path = os.path.join(self.temp_dir, 'appended.tsv')
+        shutil.copy(self.data_path, data_path)
+        n_columns = DataFile(data_path).df.shape[1]
+        old_cache = self.cache_files()
+
+        with open(data_path, 'a') as f:
+            f.write('\t'.join(['x'] * n_columns) + '\n')
+
+        df = DataFile(data_path).df
+        self.assertEqual(df.iloc[-1, 0], 'x')
+        self.assertEqual(len(self.cache_files()), 1)
+        self.assertNotEqual(old_cache, self.cache_files())
+
+    def test_df_cache_disabled(self):
+        try:
+            options.cache_dataframes = False
+            DataFile(self.data_path).df
+            self.assertEqual(len(self.cache_files()), 0)
+        finally:
+            options.cache_dataframes = True
+
+    def test_df_cache_reserve(self):
+        DataFile(self.data_path).df
+        size = os.path.getsize(self.cache_files()[0])
+        evict_df_cache(max_size=1, reserve=1024 ** 2 - size)
+        self.assertEqual(len(self.cache_files()), 1)
+        evict_df_cache(max_size=1, reserve=1024 ** 2 - size + 1)
+        self.assertEqual(len(self.cache_files()), 0)
+
+    def test_df_cache_eviction(self):
+        try:
+            options.cache_max_size = 0
+            DataFile(self.data_path).df
+            self.assertEqual(len(self.cache_files()), 0)
+        finally:
+            options.cache_max_size = 2048
+
+    def test_lazy_header(self):
+        datafile = DataFile(self.data_path)
+        header = datafile.header
+        self.assertFalse(datafile.df_is_loaded)
+        self.assertTrue(header.equals(datafile.df.columns))
+
+    def test_lazy_column(self):
+        datafile = DataFile(self.data_path)
+        by_position = datafile.get_column(1)
+        by_name = datafile.get_column(datafile.header[1])
+        self.assertFalse(datafile.df_is_loaded)
+        self.assertTrue(by_position.equals(by_name))
+        self.assertTrue(by_position.equals(datafile.df.iloc[:, 1]))
+        self.assertTrue(by_position.equals(datafile.get_column(1)))
+
+    def test_lazy_reads_follow_file(self):
+        path = os.path.join(self.temp_dir, 'lazy_reads.tsv')
+        df2file(pd.DataFrame({'a': ['1', '2'], 'b': ['x', 'y']}), path, overwrite=True)
+        datafile = DataFile(path)
+        self.assertIs(datafile.get_column(0), datafile.get_column(0))
+        self.assertEqual(list(datafile.header), ['a', 'b'])
+
+        df2file(pd.DataFrame({'c': ['3', '4', '5'], 'd': ['z'] * 3}), path, overwrite=True)
+        self.assertEqual(list(datafile.header), ['c', 'd'])
+        self.assertEqual(list(datafile.get_column(0)), ['3', '4', '5'])
+
+    def test_df_has_changed(self):
+        datafile = DataFile(self.data_path)
+        self.assertFalse(datafile.df_has_changed)
+        datafile.df
+        self.assertFalse(datafile.df_has_changed)
+
+        datafile.df.iloc[0, 1] = 'changed'
+        self.assertTrue(datafile.df_has_changed)
+
+    def test_file_is_current(self):
+        datafile = DataFile(self.data_path)
+        self.assertTrue(datafile.file_is_current)
+        datafile.df
+        self.assertTrue(datafile.file_is_current)
+
+        datafile.df.iloc[0, 1] = 'changed'
+        self.assertFalse(datafile.file_is_current)
+        self.assertFalse(DataFile(os.path.join(self.temp_dir, 'missing.tsv')).file_is_current)
+
+    def test_df_has_changed_row_order(self):
+        datafile = DataFile(self.data_path)
+        datafile.df = datafile.df.copy()
+        self.assertFalse(datafile.df_has_changed)
+        datafile.df = datafile.df.iloc[::-1].reset_index(drop=True)
+        self.assertTrue(datafile.df_has_changed)
+
+    def test_df_has_changed_when_set(self):
+        datafile = DataFile(self.data_path)
+        datafile.df = DataFile(self.data_path).df
+        self.assertTrue(datafile.df_has_changed)
+
+    def test_numeric_values(self):
+        datafile = DataFile(self.data_path)
+        self.assertFalse(datafile.is_numeric(0))
+        self.assertTrue(datafile.is_numeric(7))
+        self.assertEqual(datafile.numeric_values(7).dtype, float)
+        self.assertIs(datafile.numeric_values(7), datafile.numeric_values(7))
+
+        datafile.df.iloc[0, 7] = 'not a number'
+        self.assertFalse(datafile.is_numeric(7))
+
+    def test_numeric_values_like_float(self):
+        values = pd.Series(['1_000', '\uff11\uff12', ' 3 ', '-4e1', 'nan', pd.np.nan])
+        self.assertEqual(list(as_numeric(values).fillna(0)), [1000.0, 12.0, 3.0, -40.0, 0, 0])
+        self.assertIsNone(as_numeric(pd.Series(['1', '1,5'])))
+        self.assertIsNone(as_numeric(pd.Series(['1', ''])))
+
+    def test_column_profile(self):
+        datafile = DataFile(self.data_path)
+        profile = datafile.column_profile(7)
+        self.assertIs(profile, datafile.column_profile(7))
+        self.assertEqual(profile.min, profile.numeric.min())
+        self.assertEqual(profile.max, profile.numeric.max())
+        self.assertFalse(profile.is_empty)
+        self.assertIsNone(datafile.column_profile(0).min)
+
+        datafile.df.iloc[:, 7] = ''
+        self.assertTrue(datafile.column_profile(7).is_empty)
+        self.assertEqual(list(datafile.column_profile(7).unique), [''])
+
+    def test_df2file(self):
+        df = pd.DataFrame({'path': ['a' + Mappings.PATH_DELIM + 'b', 'ü', pd.np.nan],
+                           'value': [1.5, 2.0, 3.0]})
+        path = os.path.join(self.temp_dir, 'written', 'df2file.tsv')
+        stats = df2file(df, path, overwrite=True, chunksize=2)
+
+        self.assertEqual(stats.rows, 3)
+        self.assertEqual(stats.bytes, os.path.getsize(path))
+        self.assertEqual(df.iloc[0, 0], 'a' + Mappings.PATH_DELIM + 'b')
+        with open(path, encoding='utf-8') as f:
+            self.assertEqual(f.read().splitlines(), ['path\tvalue', 'a\\b\t1.5', 'ü\t2.0', '\t3.0'])
+        self.assertEqual(os.listdir(os.path.dirname(path)), ['df2file.tsv'])
+
+        with self.assertRaises(PathError):
+            df2file(df, path)
+
+    def test_convert_paths(self):
+        paths = pd.Series(['Demographics+Age_(years)', 'a\\_b\\c', pd.np.nan, 'Demographics+Age_(years)'],
+                          index=[3, 2, 1, 0])
+        converted = convert_paths(paths)
+        self.assertEqual(list(converted.index), [3, 2, 1, 0])
+        self.assertEqual(converted[3], 'Demographics\\Age (years)')
+        self.assertEqual(converted[2], path_converter('a\\_b\\c'))
+        self.assertTrue(pd.isnull(converted[1]))
+        self.assertEqual(list(convert_paths(['a+b'], to_internal=True)),
+                         [path_converter('a+b', to_internal=True)])
@@ -37,6 +37,18 @@ class RemappingTests(TestBase):
             list(highdim_cnv.remap_to(chrom_regions.df))
         )
 
+    def test_remap_with_memmap(self):
+        chrom_regions = self.study.Annotations.rnaseq_RNASEQ_ANNOT
+        expected = self.study.HighDim.cnv.remap_to(chrom_regions)
+        try:
+            tmtk.options.highdim_memmap = True
+            cnv = create_study_from_dir('remap').HighDim.cnv
+            remapped = cnv.remap_to(chrom_regions)
+            self.assertFalse(cnv.df_is_loaded)
+        finally:
+            tmtk.options.highdim_memmap = False
+        self.assertTrue(remapped.equals(expected))
+
     def test_hgnc_to_entrez(self):
         mapped = tmtk.toolbox.remap_id.hgnc_to_entrez(
             ['TP53', pd.np.nan, 'EGFR', 'ERBB2', pd.np.nan, 'definitely_not_a_gene']
@@ -1,7 +1,11 @@
 from unittest.mock import patch
 
 import os
+import time
+import threading
 
+import tmtk
+from tmtk.utils import file2df
 from tests.commons import TestBase, create_study_from_dir
 
 valid_inputs = ['0', '1', '', ''] * 3
@@ -47,6 +51,79 @@ class ReloadTests(TestBase):
             )
         )
 
+    def test_write_study_incremental(self):
+        study = tmtk.Study(self.study.params.path)
+        datafile = study.Clinical.get_datafile('Cell-line_clinical.txt')
+        datafile.df.iloc[0, 1] = 'changed'
+        unchanged = study.Clinical.ColumnMapping
+        new_dir = os.path.join(self.temp_dir, 'test_write_incremental')
+        study.write_to(new_dir, incremental=True, link=True, return_new=False)
+
+        sub_path = os.path.relpath(unchanged.path, study.study_folder)
+        self.assertTrue(os.path.samefile(unchanged.path, os.path.join(new_dir, sub_path)))
+
+        sub_path = os.path.relpath(datafile.path, study.study_folder)
+        new_datafile = tmtk.clinical.DataFile(os.path.join(new_dir, sub_path))
+        self.assertFalse(os.path.samefile(datafile.path, new_datafile.path))
+        self.assertEqual(new_datafile.df.iloc[0, 1], 'changed')
+
+    def test_registry(self):
+        study = tmtk.Study(self.study.params.path)
+        self.assertIn(study.Clinical.ColumnMapping, study.registry)
+        self.assertIn(study.HighDim.rnaseq.sample_mapping, study.registry)
+        self.assertEqual(study.find_params_for_datatype('clinical'), [study.Clinical.params])
+
+        datafile = study.Clinical.get_datafile('Cell-line_clinical.txt')
+        datafile.name = 'renamed.txt'
+        self.assertIs(study.Clinical.get_datafile('renamed.txt'), datafile)
+        self.assertIsNone(study.Clinical.get_datafile('Cell-line_clinical.txt'))
+
+        self.assertIsNone(study.Clinical.get_datafile('missing.txt'))
+
+        del study.Clinical.Cell_line_clinical_txt
+        self.assertNotIn(datafile, study.get_objects(tmtk.utils.FileBase))
+
+        valid_study = create_study_from_dir('valid_study')
+        annotation = valid_study.find_annotation('RNASEQ_ANNOT')
+        annotation.platform = 'NEW_PLATFORM'
+        self.assertIs(valid_study.find_annotation('NEW_PLATFORM'), annotation)
+
+    def test_patients_df(self):
+        patients = self.study.Clinical.get_patients_df()
+        self.assertEqual(list(patients.columns), ['gender', 'age'])
+        self.assertTrue(patients.index.is_unique)
+        self.assertEqual(list(patients.loc['LS513']), ['Male', '63'])
+        self.assertTrue(patients.loc['SW1398'].isnull().all())
+        self.assertEqual(self.study.Clinical.get_patients()['SW1398'], {})
+
+    def test_preload(self):
+        self.assertFalse(all(obj.df_is_loaded for obj in self.study.all_files))
+        study = tmtk.Study(self.study.params.path, preload=True, workers=2)
+        self.assertTrue(all(obj.df_is_loaded for obj in study.all_files))
+        self.assertTrue(study.Clinical.ColumnMapping.df.equals(self.study.Clinical.ColumnMapping.df))
+
+    def test_get_column_applies_df_mods(self):
+        study = create_study_from_dir('valid_study')
+        word_mapping = study.Clinical.WordMapping
+        column = word_mapping.get_column(1)
+        self.assertTrue(column.equals(word_mapping.df.iloc[:, 1]))
+
+    def test_concurrent_load(self):
+        study = tmtk.Study(self.study.params.path)
+        datafile = study.Clinical.get_datafile('Cell-line_clinical.txt')
+
+        def slow_file2df(path, **kwargs):
+            time.sleep(0.1)
+            return file2df(path, **kwargs)
+
+        with patch('tmtk.utils.filebase.file2df', side_effect=slow_file2df) as read:
+            threads = [threading.Thread(target=lambda: datafile.df) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(read.call_count, 1)
+
     @patch('tmtk.params.base.get_input', side_effect=get_valid_input)
     def test_update_params(self, x):
         self.study.Clinical.params.update()
@@ -1,7 +1,19 @@
+import gzip
+import os
+import struct
+import unittest
 import tmtk
 
 import pandas as pd
 from tests.commons import TestBase, create_study_from_dir
+from tmtk.toolbox.skinny_loader.i2b2demodata.patient_dimension import PatientDimension
+from tmtk.toolbox.skinny_loader.shared import get_unix_timestamps
+from tmtk.toolbox.skinny_loader.writers import get_writer, PgCopyWriter, ParquetWriter, TsvWriter, SplitWriter
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
 
 
 class SkinnyTests(TestBase):
@@ -47,7 +59,152 @@ class SkinnyTests(TestBase):
         df = self.export.patient_dimension.df
         self.assertNotIn(pd.np.nan, set(df.sex_cd))
 
+    def test_observation_fact_blocks(self):
+        # Use a separate study, test_no_top_node changes the top node of self.study.
+        export = tmtk.toolbox.SkinnyExport(create_study_from_dir('TEST_17_1'), self.temp_dir)
+        export.build_observation_fact()
+        blocks = list(export.observation_fact.iter_blocks(chunksize=100))
+        self.assertGreater(len(blocks), 1)
+        self.assertTrue(all(len(block) >= 100 for block in blocks[:-1]))
+        df = pd.concat(blocks, ignore_index=True)
+        self.assertTrue(df.equals(export.observation_fact.df))
+
+    def test_observation_fact_workers(self):
+        export = tmtk.toolbox.SkinnyExport(self.study, os.path.join(self.temp_dir, 'workers'))
+        export.observation_fact_to_disk(workers=2)
+        path = os.path.join(export.export_directory, 'i2b2demodata', 'observation_fact.tsv')
+        self.assertEqual(os.listdir(os.path.dirname(path)), ['observation_fact.tsv'])
+
+        df = pd.read_table(path, sep='\t', dtype=object)
+        self.assertEqual(df.shape, self.export.observation_fact.df.shape)
+        self.assertEqual(df[self.export.observation_fact.primary_key].duplicated().sum(), 0)
+
+    def test_observation_fact_split(self):
+        export = tmtk.toolbox.SkinnyExport(self.study, os.path.join(self.temp_dir, 'split'))
+        directory = os.path.join(export.export_directory, 'i2b2demodata')
+        n_rows = self.export.observation_fact.df.shape[0]
+
+        for workers in (1, 2):
+            export.observation_fact_to_disk(workers=workers, compression='gzip', max_rows=100)
+            files = sorted(os.listdir(directory))
+            self.assertEqual(files[0], 'observation_fact.part-00000.tsv.gz')
+            self.assertTrue(all(f.startswith('observation_fact.part-') for f in files))
+
+            parts = [pd.read_table(os.path.join(directory, f), sep='\t', dtype=object) for f in files]
+            self.assertTrue(all(len(part) <= 100 for part in parts))
+            self.assertEqual(sum(len(part) for part in parts), n_rows)
+
+    def test_date_timestamps(self):
+        df = self.export.observation_fact.df
+        dates = df[df.valtype_cd == 'D']
+        self.assertEqual(list(dates.nval_num[:2]), [378691200000, 231811200000])
+
+        values = pd.Series(['1982-01-01', None, 'not a date', '0001-01-01', '1982-01-01T02:00:00+02:00'])
+        timestamps = get_unix_timestamps(values, '%Y-%m-%d')
+        self.assertEqual(timestamps[0], 378691200000)
+        self.assertTrue(pd.isnull(timestamps[1:3]).all())
+        self.assertEqual(timestamps[3], -62135596800000)
+        self.assertEqual(timestamps[4], 378691200000)
+
+    def test_patient_dimension_order(self):
+        df = self.export.patient_dimension.df
+        self.assertEqual(list(df.sourcesystem_cd), list(self.study.Clinical.get_patients_df().index))
+
+    def test_patient_dimension_non_numeric_age(self):
+        study = create_study_from_dir('TEST_17_1')
+        study.Clinical.PATIENT_PROPERTY_LABELS = (('gender', ('Sex',)), ('age', ('Race',)))
+        df = PatientDimension(study).df
+        self.assertTrue(df.age_in_years_num.isnull().all())
+        self.assertEqual(df.shape[0], self.export.patient_dimension.df.shape[0])
+
     def test_no_top_node(self):
         self.assertEqual((41, 27), self.export.i2b2_secure.df.shape)
         self.export2 = tmtk.toolbox.SkinnyExport(self.study, self.temp_dir, add_top_node=False)
         self.assertEqual((39, 27), self.export2.i2b2_secure.df.shape)
+
+
+class WriterTests(TestBase):
+
+    @classmethod
+    def setup_class_hook(cls):
+        cls.df = pd.DataFrame({'num': [1, -20000, 3],
+                               'text': ['a', pd.np.nan, 'ü'],
+                               'date': ['2000-01-02', None, '1999-12-31 23:59:59']},
+                              columns=['num', 'text', 'date'])
+        cls.types = {'num': 'numeric(38,0)', 'date': 'timestamp'}
+
+    def test_tsv_writer(self):
+        path = os.path.join(self.temp_dir, 'table.tsv')
+        with TsvWriter(path, self.df.columns) as writer:
+            writer.write(self.df.iloc[:2])
+            writer.write(self.df.iloc[2:])
+        with open(path) as f:
+            self.assertEqual(f.read(), self.df.to_csv(sep='\t', index=False))
+
+    def test_pgcopy_writer(self):
+        path = os.path.join(self.temp_dir, 'table.bin')
+        fragments = [os.path.join(self.temp_dir, 'fragment{}.bin'.format(i)) for i in range(2)]
+        for fragment, rows in zip(fragments, (slice(0, 2), slice(2, 3))):
+            with PgCopyWriter(fragment, self.df.columns, self.types, fragment=True) as writer:
+                writer.write(self.df.iloc[rows])
+        PgCopyWriter.merge(fragments, path, self.df.columns, self.types)
+
+        with open(path, 'rb') as f:
+            data = f.read()
+        self.assertTrue(data.startswith(b'PGCOPY\n\xff\r\n\x00'))
+        self.assertTrue(data.endswith(struct.pack('>h', -1)))
+
+        # First row: numeric 1, text 'a' and one day after the PostgreSQL epoch in microseconds.
+        row = struct.pack('>h', 3) + \
+            struct.pack('>ihhHhH', 10, 1, 0, 0, 0, 1) + \
+            struct.pack('>i', 1) + b'a' + \
+            struct.pack('>iq', 8, 24 * 3600 * 10 ** 6)
+        self.assertEqual(data[19:19 + len(row)], row)
+        self.assertIn(struct.pack('>i', 2) + 'ü'.encode(), data)
+        self.assertIn(struct.pack('>iq', 8, -10 ** 6), data)
+
+    @unittest.skipIf(pyarrow is None, 'requires pyarrow')
+    def test_parquet_writer(self):
+        path = os.path.join(self.temp_dir, 'table.parquet')
+        with ParquetWriter(path, self.df.columns, self.types) as writer:
+            writer.write(self.df)
+        df = pd.read_parquet(path)
+        self.assertEqual(list(df.num), [1, -20000, 3])
+        self.assertTrue(pd.isnull(df.text[1]))
+
+    def test_compressed_split_writer(self):
+        path = os.path.join(self.temp_dir, 'split', 'table.tsv.gz')
+        with SplitWriter('tsv', path, self.df.columns, compression='gzip', max_rows=2) as writer:
+            writer.write(self.df)
+            writer.write(self.df)
+        self.assertEqual([os.path.basename(p) for p in writer.paths],
+                         ['table.part-00000.tsv.gz', 'table.part-00001.tsv.gz', 'table.part-00002.tsv.gz'])
+        self.assertEqual(writer.rows, 6)
+        with gzip.open(writer.paths[1], 'rt') as f:
+            self.assertEqual(f.read(), self.df.iloc[[2, 0]].to_csv(sep='\t', index=False))
+
+        # Parts of an earlier, larger export are removed.
+        with SplitWriter('tsv', path, self.df.columns, compression='gzip', max_rows=10) as writer:
+            writer.write(self.df)
+        self.assertEqual(os.listdir(os.path.dirname(path)), ['table.part-00000.tsv.gz'])
+
+    @unittest.skipIf(pyarrow is None, 'requires pyarrow')
+    def test_compressed_split_parquet_writer(self):
+        path = os.path.join(self.temp_dir, 'split_parquet', 'table.parquet')
+        with SplitWriter(ParquetWriter, path, self.df.columns, self.types, compression='gzip', max_rows=2) as writer:
+            writer.write(self.df)
+        self.assertEqual([os.path.basename(p) for p in writer.paths],
+                         ['table.part-00000.parquet', 'table.part-00001.parquet'])
+        df = pd.concat([pd.read_parquet(p) for p in writer.paths], ignore_index=True)
+        self.assertEqual(list(df.num), [1, -20000, 3])
+
+    @unittest.skipIf(pyarrow is not None, 'pyarrow is installed')
+    def test_parquet_writer_without_pyarrow(self):
+        with self.assertRaises(ImportError):
+            ParquetWriter(os.path.join(self.temp_dir, 'table.parquet'), self.df.columns, compression='gzip')
+
+    def test_get_writer(self):
+        self.assertIs(get_writer('pgcopy'), PgCopyWriter)
+        self.assertIs(get_writer(TsvWriter), TsvWriter)
+        with self.assertRaises(ValueError):
+            get_writer('xlsx')
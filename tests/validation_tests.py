@@ -1,9 +1,14 @@
+import os
+import shutil
 from contextlib import redirect_stdout
 
 import pandas as pd
 from io import StringIO
 
-from tmtk.utils import validate
+import tmtk
+from tmtk import options
+from tmtk.highdim.NumericMatrix import NumericMatrix
+from tmtk.utils import clear_df_cache, validate
 from tests.commons import TestBase, create_study_from_dir
 
 
@@ -94,9 +99,79 @@ class ValidationTests(TestBase):
                                                                                    'Cell-line_clinical.txt')
         self.assertEqual(messages[3], warning_template.format(unmapped_warning))
 
+    def test_duplicate_subj_ids(self):
+        study = create_study_from_dir('TEST_17_1')
+
+        with StringIO() as buffer, redirect_stdout(buffer):
+            study.Clinical._validate_SUBJ_IDs()
+            messages = buffer.getvalue().splitlines()
+
+        self.assertEqual(len(messages), len(study.Clinical.ColumnMapping.included_datafiles))
+        self.assertIn('OBS336-201_vitals.txt, but it has duplicate values', messages[-1])
+
+        visits = study.Clinical.get_trial_visits()
+        self.assertEqual(visits[0], {'name': 'General'})
+        self.assertIn({'name': 'Week 6', 'relative_time': '6', 'time_unit': 'Weeks'}, visits)
+
     def test_cnv_probs(self):
         self.assertFalse(self.invalid_study.HighDim.cnv._validate_probabilities())
 
+    def test_cnv_probs_in_chunks(self):
+        cnv = create_study_from_dir('invalid_study').HighDim.cnv
+        cnv.CHUNK_SIZE = 1
+        cnv._validate_probabilities()
+        self.assertFalse(cnv.df_is_loaded)
+        self.assertTrue(cnv.msgs.has_error)
+
+    def test_highdim_chunks(self):
+        cnv = create_study_from_dir('valid_study').HighDim.cnv
+        chunks = list(cnv.iter_chunks(chunksize=1))
+        self.assertEqual(len(chunks), cnv.df.shape[0])
+        self.assertEqual(pd.concat(chunks).shape, cnv.df.shape)
+        self.assertEqual(chunks[0].iloc[:, 1:].dtypes.unique(), [float])
+
+    def test_cnv_probs_with_memmap(self):
+        cnv = create_study_from_dir('invalid_study').HighDim.cnv
+        try:
+            options.highdim_memmap = True
+            cnv._validate_probabilities()
+        finally:
+            options.highdim_memmap = False
+        self.assertFalse(cnv.df_is_loaded)
+        self.assertTrue(cnv.msgs.has_error)
+
+    def test_highdim_save_without_loading(self):
+        study_dir = os.path.join(self.temp_dir, 'save_highdim')
+        shutil.copytree(os.path.join(self.studies_dir, 'valid_study'), study_dir)
+        cnv = tmtk.Study(os.path.join(study_dir, 'study.params')).HighDim.cnv
+        with open(cnv.path) as f:
+            original = f.read()
+        cnv.save()
+        self.assertFalse(cnv.df_is_loaded)
+        with open(cnv.path) as f:
+            self.assertEqual(f.read().splitlines()[0], original.splitlines()[0])
+        self.assertEqual(len(cnv.df), len(original.splitlines()) - 1)
+
+    def test_highdim_matrix(self):
+        cnv = create_study_from_dir('valid_study').HighDim.cnv
+        matrix = cnv.matrix()
+        self.assertIsInstance(matrix.values, pd.np.memmap)
+        self.assertEqual(matrix.values.filename, cnv.matrix().values.filename)
+        expected = cnv.iter_chunks().__next__().iloc[:, 1:].values
+        self.assertTrue(pd.np.allclose(matrix.values, expected, equal_nan=True))
+        self.assertEqual(list(matrix.row_ids), list(cnv.df.iloc[:, 0].astype(str)))
+        self.assertNotIsInstance(cnv.matrix().values, pd.np.memmap)
+
+    def test_highdim_matrix_cache_limit(self):
+        cnv = create_study_from_dir('valid_study').HighDim.cnv
+        clear_df_cache()
+        try:
+            options.cache_max_size = 0
+            matrix = NumericMatrix.from_datafile(cnv)
+            self.assertTrue(os.path.exists(matrix.values.filename))
+        finally:
+            options.cache_max_size = 2048
+
     def test_expression_header(self):
         self.assertFalse(self.invalid_study.HighDim.expression_dataset1._validate_id_ref())
 
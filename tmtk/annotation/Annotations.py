@@ -1,7 +1,7 @@
-from ..utils import clean_for_namespace, FileBase, Mappings, PathError
+from ..utils import clean_for_namespace, FileBase, Mappings, PathError, RegistryMixin
 
 
-class Annotations:
+class Annotations(RegistryMixin):
     """
     Class containing all AnnotationFile objects.
     """
@@ -28,7 +28,7 @@ class Annotations:
 
             platform_key = annotation_type + af.platform
             platform_key = clean_for_namespace(platform_key)
-            self.__dict__[platform_key] = af
+            setattr(self, platform_key, af)
 
     def validate_all(self, verbosity=3):
         for key, obj in self.__dict__.items():
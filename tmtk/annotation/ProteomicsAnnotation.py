@@ -8,8 +8,8 @@ class ProteomicsAnnotation(AnnotationBase):
 
     @property
     def biomarkers(self):
-        probeset_id_column = self.df.columns[self.df.columns.str.upper() == 'PROBESETID']
+        probeset_id_column = self.header[self.header.str.upper() == 'PROBESETID']
         if len(probeset_id_column) != 1:
             self.msgs.error('Expected a probesetid column but got {}'.format(len(probeset_id_column)))
             return None
-        return self.df.loc[:, probeset_id_column[0]]
+        return self.get_column(probeset_id_column[0])
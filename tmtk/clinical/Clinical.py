@@ -9,11 +9,12 @@ from .Variable import Variable, VarID
 from .WordMapping import WordMapping
 from .modifier import Modifiers
 from .trial_vists import TrialVisits
-from ..utils import PathError, clean_for_namespace, FileBase, ValidateMixin, path_converter, BlueprintException
+from ..utils import (PathError, clean_for_namespace, FileBase, ValidateMixin, RegistryMixin, path_converter,
+                     BlueprintException)
 from ..utils.batch import TransmartBatch
 
 
-class Clinical(ValidateMixin):
+class Clinical(ValidateMixin, RegistryMixin):
     """
     Container class for all clinical data related objects, i.e. the column
     mapping, word mapping, and clinical data files.
@@ -22,6 +23,10 @@ class Clinical(ValidateMixin):
     files and variables.
     """
 
+    # Data labels that hold demographics for patients, later labels take precedence.
+    PATIENT_PROPERTY_LABELS = (('gender', ('gender', 'Gender', 'GENDER', 'sex', 'Sex', 'SEX')),
+                               ('age', ('Age', 'age', 'AGE')))
+
     def __init__(self, clinical_params=None):
         self._ColumnMapping = None
         self.WordMapping = None
@@ -29,6 +34,7 @@ class Clinical(ValidateMixin):
         self.Modifiers = None
         self.TrialVisits = None
         self._params = clinical_params
+        self._variables = {}
 
     def __str__(self):
         return "ClinicalObject ({})".format(self.params.path)
@@ -58,6 +64,7 @@ class Clinical(ValidateMixin):
     @ColumnMapping.setter
     def ColumnMapping(self, value):
         self._ColumnMapping = value
+        self._variables.clear()
         for file in self.ColumnMapping.included_datafiles:
             clinical_data_path = os.path.join(self.params.dirname, file)
             self.add_datafile(clinical_data_path)
@@ -100,43 +107,51 @@ class Clinical(ValidateMixin):
             }
         :param omit_missing: if True, then variable that are not present in the blueprint
         will be set to OMIT.
+
+        All changes are collected first and then written to the column mapping and
+        word mapping at once. If the blueprint is invalid, nothing is changed.
         """
+        # Column mapping positions: category code, data label, reference column, concept code, data type.
+        updates = {1: {}, 3: {}, 4: {}, 5: {}, 6: {}}
+        word_maps = {}
+
         for var_id, variable in self.all_variables.items():
+            var_id = tuple(var_id)
 
             blueprint_var = blueprint.get(variable.header.strip())
 
             if not blueprint_var:
                 self.msgs.info("Column with header {!r}. Not found in blueprint.".format(variable.header))
                 if omit_missing:
-                    variable.data_label = 'OMIT'
+                    updates[3][var_id] = 'OMIT'
                 continue
 
             if blueprint_var.get('path') is not None:
-                variable.category_code = path_converter(blueprint_var.get('path'))
+                updates[1][var_id] = path_converter(blueprint_var.get('path'))
 
             if blueprint_var.get('label') is not None:
-                variable.data_label = blueprint_var.get('label')
+                updates[3][var_id] = blueprint_var.get('label')
 
             if blueprint_var.get('word_map'):
-                variable.word_map_dict = blueprint_var.get('word_map')
+                word_maps[var_id] = blueprint_var.get('word_map')
 
             if blueprint_var.get('concept_code'):
-                variable.concept_code = blueprint_var.get('concept_code')
+                updates[5][var_id] = blueprint_var.get('concept_code')
 
             if blueprint_var.get('force_categorical') and blueprint_var.get('data_type'):
                 msg = "Both 'force_categorical' and 'data_type' found for {!r}".format(variable.header)
                 raise BlueprintException(msg)
 
             elif blueprint_var.get('data_type'):
-                variable.column_type = blueprint_var.get('data_type')
+                updates[6][var_id] = blueprint_var.get('data_type')
 
             elif blueprint_var.get('force_categorical'):
-                variable.forced_categorical = blueprint_var.get('force_categorical') == "Y"
+                updates[6][var_id] = 'CATEGORICAL' if blueprint_var.get('force_categorical') == "Y" else ''
 
             reference_column = blueprint_var.get('reference_column')
             if reference_column is not None:
                 try:
-                    variable.reference_column = variable.datafile.df.columns.get_loc(reference_column) + 1
+                    updates[4][var_id] = variable.datafile.df.columns.get_loc(reference_column) + 1
                 except KeyError:
                     msg = 'Cannot find reference column {!r} within dataframe header'.format(reference_column)
                     raise BlueprintException(msg)
@@ -170,6 +185,9 @@ class Clinical(ValidateMixin):
                                       format(variable.header, expected_categorical, list(unexpected))
                                       )
 
+        self.ColumnMapping.update_columns(updates)
+        self.WordMapping.set_word_maps(word_maps)
+
     def add_datafile(self, filename, dataframe=None):
         """
         Add a clinical data file to study.
@@ -201,7 +219,8 @@ class Clinical(ValidateMixin):
             datafile.name = new_name if not new_name == '' else datafile.name
 
         safe_name = clean_for_namespace(datafile.name)
-        self.__dict__[safe_name] = datafile
+        setattr(self, safe_name, datafile)
+        self._variables.clear()
 
         if datafile.name not in self.ColumnMapping.included_datafiles:
             self.msgs.okay('Adding {!r} as clinical datafile to study.'.format(datafile.name))
@@ -209,14 +228,18 @@ class Clinical(ValidateMixin):
 
     def get_variable(self, var_id: tuple):
         """
-        Return a Variable object based on variable id.
+        Return a Variable object based on variable id. Variable objects hold no
+        state of their own, so they are created once and reused.
 
         :param var_id: tuple of filename and column number.
         :return: `tmtk.Variable`.
         """
         df_name, column = var_id
-        datafile = self.get_datafile(df_name)
-        return Variable(datafile, column, self)
+        variable = self._variables.get((df_name, column))
+        if variable is None or variable.datafile.name != df_name:
+            variable = Variable(self.get_datafile(df_name), column, self)
+            self._variables[(df_name, column)] = variable
+        return variable
 
     def find_variables_by_label(self, label: str, in_file: str=None) -> list:
         """
@@ -226,42 +249,51 @@ class Clinical(ValidateMixin):
         :param in_file:
         :return:
         """
-        sliced = self.ColumnMapping.df.iloc[:, 3] == label
-        if in_file:
-            sliced = sliced & (self.ColumnMapping.df.iloc[:, 0] == in_file)
-        return [self.get_variable(x[0]) for x in self.ColumnMapping.df[sliced].iterrows()]
+        return [self.get_variable(var_id) for var_id in self.ColumnMapping.ids_by_label(label, in_file or None)]
 
-    def get_patients(self):
+    def get_patients_df(self):
         """
-        Creates a dictionary that has subject identifiers as keys and each value is a map
-        that contains an nothing or an 'age' and/or 'gender' key that maps to this value.
+        Creates a dataframe with a row for every subject identifier, in order of first
+        occurrence in the data files, and a 'gender' and 'age' column. Subjects without a
+        value for these get NaN. If there are multiple variables for a property, the last
+        value found for each subject is used.
 
-        :return: patients dict.
+        :return: `pd.DataFrame` with subject identifiers as index.
         """
+        subj_ids = [var.values.values for var in self.find_variables_by_label('SUBJ_ID')]
+        subjects = pd.unique(pd.np.concatenate(subj_ids)) if subj_ids else []
+        patients = pd.DataFrame(index=pd.Index(subjects, name='subj_id', dtype=object))
 
-        def add_patient_properties(subjects_dict, destination, labels):
+        for destination, labels in self.PATIENT_PROPERTY_LABELS:
             vars_ = [v for label in labels for v in self.find_variables_by_label(label)]
 
             if len(vars_) > 1:
                 print("More than one {!r} defined, will pick last "
                       "value found for each subject.".format(destination))
 
-            for var in vars_:
-                for k, v in zip(var.subj_id.values, var.values):
-                    if v in (None, '', pd.np.nan):
-                        continue
-
-                    subjects_dict[k].update({destination: v})
+            if not vars_:
+                patients[destination] = pd.np.nan
+                continue
 
-        subj_id_vars = self.find_variables_by_label('SUBJ_ID')
+            values = pd.concat([pd.DataFrame({'subj_id': var.subj_id.values.values, 'value': var.values.values})
+                                for var in vars_], ignore_index=True)
+            values = values[values['value'].notnull() & (values['value'] != '')]
+            values = values.drop_duplicates('subj_id', keep='last').set_index('subj_id')['value']
+            patients[destination] = values.reindex(patients.index)
 
-        # Create dictionary where every subject is a key with value as empty dictionary
-        subjects = {subj_id: {} for var in subj_id_vars for subj_id in var.values}
+        return patients
 
-        add_patient_properties(subjects, 'gender', ('gender', 'Gender', 'GENDER', 'sex', 'Sex', 'SEX'))
-        add_patient_properties(subjects, 'age', ('Age', 'age', 'AGE'))
+    def get_patients(self):
+        """
+        Creates a dictionary that has subject identifiers as keys and each value is a map
+        that contains an nothing or an 'age' and/or 'gender' key that maps to this value.
+        See :meth:`get_patients_df` for a dataframe with the same information.
 
-        return subjects
+        :return: patients dict.
+        """
+        patients = self.get_patients_df()
+        return {subj_id: {k: v for k, v in zip(patients.columns, row) if not pd.isnull(v)}
+                for subj_id, row in zip(patients.index, patients.values.tolist())}
 
     def get_trial_visits(self):
         """
@@ -272,25 +304,21 @@ class Clinical(ValidateMixin):
         :return: list of dicts.
         """
 
-        visit_labels = {'General': {'name': 'General'}}
-        visit_labels.update({l: {'name': l}
-                             for var in self.find_variables_by_label('TRIAL_VISIT_LABEL')
-                             for l in var.values})
-        visit_labels.update({l: {'name': l} for l in self.TrialVisits.df.iloc[:, 0]})
-
-        self.TrialVisits.df.apply(
-            lambda x: visit_labels[x[0]].update(
-                {'relative_time': x[1],
-                 'time_unit': x[2]}
-            ), axis=1
-        )
-        for missing in ('', None, pd.np.nan):
-            try:
-                visit_labels.pop(missing)
-            except KeyError:
-                pass
-
-        return list(visit_labels.values())
+        visits = self.TrialVisits.df
+        labels = pd.unique(pd.np.concatenate(
+            [pd.np.array(['General'], dtype=object)] +
+            [var.values.values for var in self.find_variables_by_label('TRIAL_VISIT_LABEL')] +
+            [visits.iloc[:, 0].values]))
+        labels = labels[pd.notnull(labels) & (labels != '')]
+
+        # If a visit is annotated more than once, the last row is used.
+        annotated = visits.drop_duplicates(visits.columns[0], keep='last')
+        annotations = {label: {'relative_time': relative_time, 'time_unit': time_unit}
+                       for label, relative_time, time_unit in zip(annotated.iloc[:, 0],
+                                                                  annotated.iloc[:, 1],
+                                                                  annotated.iloc[:, 2])}
+
+        return [dict({'name': label}, **annotations.get(label, {})) for label in labels]
 
     @property
     def all_variables(self):
@@ -321,10 +349,8 @@ class Clinical(ValidateMixin):
         :param name: name of file.
         :return: `tmtk.DataFile` object.
         """
-        for key, obj in self.__dict__.items():
-            if isinstance(obj, DataFile):
-                if obj.name == name:
-                    return obj
+        for obj in self.registry.find('name', name, of_type=DataFile):
+            return obj
 
     def __hash__(self):
         """
@@ -382,21 +408,26 @@ class Clinical(ValidateMixin):
             self.msgs.error('Clinical params not on disk.')
 
     def _validate_SUBJ_IDs(self):
+        df = self.ColumnMapping.df
+        subj_ids = df.loc[(df.iloc[:, 3] == 'SUBJ_ID').values, df.columns[[0, 2]]]
+        counts = subj_ids.iloc[:, 0].value_counts()
+        columns = dict(zip(subj_ids.iloc[:, 0], subj_ids.iloc[:, 1]))
+
         for datafile in self.ColumnMapping.included_datafiles:
-            var_id_list = [var_id for var_id in self.ColumnMapping.subj_id_columns if var_id[0] == datafile]
 
             # Check for one SUBJ_ID per file
-            if len(var_id_list) == 1:
+            if counts.get(datafile, 0) == 1:
 
-                subj_id = self.get_variable(var_id_list[0])
-                if len(subj_id.values) == len(subj_id.unique_values):
+                values = self.get_datafile(datafile).get_column(int(columns[datafile]) - 1)
+                duplicates = values[values.duplicated()]
+                if duplicates.empty:
                     self.msgs.okay('Found a SUBJ_ID for {} and it has unique values, thats good!'.format(datafile))
                 else:
                     self.msgs.error('Found a SUBJ_ID for {}, but it has duplicate values.'.format(datafile),
-                                    warning_list=subj_id.values[subj_id.values.duplicated()].unique())
+                                    warning_list=list(duplicates.unique()))
 
             else:
-                self.msgs.error('Found {} SUBJ_ID for {}'.format(len(var_id_list), datafile))
+                self.msgs.error('Found {} SUBJ_ID for {}'.format(counts.get(datafile, 0), datafile))
 
     def _validate_word_mappings(self):
 
@@ -1,8 +1,8 @@
 import os
 import pandas as pd
 
-from ..utils import (FileBase, Exceptions, Mappings, path_converter,
-                     path_join, column_map_diff, ValidateMixin)
+from ..utils import (FileBase, Exceptions, Mappings, path_converter, convert_paths,
+                     path_join, ValidateMixin)
 from ..params import ClinicalParams
 from .DataFile import DataFile
 
@@ -28,6 +28,9 @@ class ColumnMapping(FileBase, ValidateMixin):
                          'OMIT',
                          'PATIENT_VISIT')
 
+    # Category code and data label.
+    _path_columns = (1, 3)
+
     def __init__(self, params=None):
         """
         Initialize by giving a parameter object.
@@ -35,6 +38,8 @@ class ColumnMapping(FileBase, ValidateMixin):
         :param params: `ClinicalParams` object.
         """
         self.params = params
+        self._label_cache = None
+        self._initial_paths = None
 
         if not isinstance(params, ClinicalParams):
             raise Exceptions.ClassError(type(params))
@@ -45,7 +50,32 @@ class ColumnMapping(FileBase, ValidateMixin):
             setattr(self.params, 'COLUMN_MAP_FILE', os.path.basename(self.path))
         super().__init__()
 
-        self._initial_paths = self.path_id_dict
+    @property
+    def df(self):
+        """The pd.DataFrame for this file object."""
+        return self._df
+
+    @df.setter
+    def df(self, value):
+        if not self.df_is_loaded:
+            self._df  # Load the baseline for path_changes first.
+        FileBase.df.fset(self, value)
+
+    def _df_loaded(self, df):
+        self._initial_paths = self._path_frame(df)
+
+    @staticmethod
+    def _path_frame(df):
+        """
+        Copy of the columns that make up concept paths, with one row per variable
+        identifier: filename, column number, category code and data label.
+        """
+        frame = pd.DataFrame({'filename': df.iloc[:, 0].values,
+                              'column': df.iloc[:, 2].values,
+                              'category_code': df.iloc[:, 1].values,
+                              'data_label': df.iloc[:, 3].values},
+                             columns=['filename', 'column', 'category_code', 'data_label'])
+        return frame.drop_duplicates(['filename', 'column'], keep='last')
 
     @property
     def included_datafiles(self):
@@ -55,8 +85,59 @@ class ColumnMapping(FileBase, ValidateMixin):
     @property
     def ids(self):
         """A list of variable identifier tuples."""
-        self.build_index()
-        return list(self.df.index)
+        return list(self.build_index().index)
+
+    @property
+    def _labels(self):
+        """
+        Index of variables by data label and data file. For every label and file it has
+        a list with variable identifiers and the set of columns given in the reference
+        column, or None if the reference column is empty. Built in one pass over the
+        dataframe and rebuilt when the digests of the variable identifiers, data labels
+        or reference column differ, so changes made in place are picked up as well.
+        """
+        df = self.df
+        key = tuple(self._column_hash(column) for column in
+                    [df.index] + [df.iloc[:, i] for i in range(3, min(5, df.shape[1]))])
+        if self._label_cache is None or self._label_cache[0] != key:
+            references = df.iloc[:, 4] if df.shape[1] > 4 else [None] * df.shape[0]
+            labels = {}
+            for var_id, label, reference in zip(df.index, df.iloc[:, 3], references):
+                if reference in (None, pd.np.nan, ''):
+                    referenced_columns = None
+                else:
+                    referenced_columns = set(str(reference).split(','))
+                labels.setdefault(label, {}).setdefault(var_id[0], []).append((var_id, referenced_columns))
+            self._label_cache = key, labels
+        return self._label_cache[1]
+
+    def ids_by_label(self, label: str, filename: str = None):
+        """
+        Variable identifiers for all variables with a data label.
+
+        :param label: data label.
+        :param filename: if given, only return variables in this data file.
+        :return: list of variable identifier tuples.
+        """
+        by_file = self._labels.get(label, {})
+        if filename is not None:
+            return [var_id for var_id, _ in by_file.get(filename, [])]
+        return [var_id for variables in by_file.values() for var_id, _ in variables]
+
+    def keyword_ids(self, label: str, var_id: tuple):
+        """
+        Variable identifiers of keyword variables (e.g. SUBJ_ID or MODIFIER) that apply
+        to a variable. These are in the same data file and have an empty reference
+        column, or a comma separated reference column that contains the column of var_id.
+
+        :param label: data label of the keyword variables.
+        :param var_id: tuple of filename and column number.
+        :return: list of variable identifier tuples.
+        """
+        filename, column = tuple(var_id)[:2]
+        column = str(column)
+        return [keyword_id for keyword_id, referenced_columns in self._labels.get(label, {}).get(filename, [])
+                if referenced_columns is None or column in referenced_columns]
 
     def create_df(self):
         """
@@ -77,12 +158,13 @@ class ColumnMapping(FileBase, ValidateMixin):
         :param var_id: tuple of filename and column number.
         :return: list of items in selected row.
         """
-        rows = self.df.loc[tuple(var_id)]
+        df = self.df
+        position = df.index.get_loc(tuple(var_id))
 
-        if isinstance(rows, pd.Series):
-            return list(rows)
-        elif isinstance(rows, pd.DataFrame):
+        if not isinstance(position, (int, pd.np.integer)):
+            rows = df.iloc[position]
             raise Exceptions.TooManyValues(rows.shape[0], 1, var_id)
+        return df.iloc[position].tolist()
 
     def get_concept_path(self, var_id: tuple):
         """
@@ -106,16 +188,16 @@ class ColumnMapping(FileBase, ValidateMixin):
         if path is None and label is None:
             raise Exception('Need to give path or label')
 
-        columns_to_update = [self.df.columns[1], self.df.columns[3]]
+        positions = [1, 3]
         new_values = [path, label]
         if path is None:
-            columns_to_update.pop(0)
-            new_values = new_values[1]
+            positions.pop(0)
+            new_values.pop(0)
         if label is None:
-            columns_to_update.pop(1)
-            new_values = new_values[0]
+            positions.pop(1)
+            new_values.pop(1)
 
-        self.df.loc[tuple(var_id), columns_to_update] = new_values
+        self._set_values(var_id, positions, new_values)
 
     def set_reference_column(self, var_id: tuple, value):
         """
@@ -125,7 +207,7 @@ class ColumnMapping(FileBase, ValidateMixin):
         :param var_id: tuple of filename and column number.
         :param value: value to set reference column to.
         """
-        self.df.loc[tuple(var_id), self.df.columns[4]] = value
+        self._set_values(var_id, [4], [value])
 
     def set_concept_code(self, var_id: tuple, value):
         """
@@ -134,7 +216,7 @@ class ColumnMapping(FileBase, ValidateMixin):
         :param var_id: tuple of filename and column number.
         :param value: value to set concept code to.
         """
-        self.df.loc[tuple(var_id), self.df.columns[5]] = value
+        self._set_values(var_id, [5], [value])
 
     def set_column_type(self, var_id: tuple, value: str):
         """
@@ -143,7 +225,47 @@ class ColumnMapping(FileBase, ValidateMixin):
         :param var_id: tuple of filename and column number.
         :param value: value to set column type to.
         """
-        self.df.loc[tuple(var_id), self.df.columns[6]] = value
+        self._set_values(var_id, [6], [value])
+
+    def update_columns(self, updates: dict):
+        """
+        Set values for many variables at once. Every column is updated in a
+        single assignment, instead of one lookup per variable.
+
+        :param updates: dictionary with column positions as keys and dictionaries
+            with variable identifier tuples as keys and new values as values.
+        """
+        df = self.build_index()
+
+        if not df.index.is_unique:
+            for position, values in updates.items():
+                for var_id, value in values.items():
+                    self._set_values(var_id, [position], [value])
+            return
+
+        for position, values in updates.items():
+            if not values:
+                continue
+            rows = df.index.get_indexer([tuple(var_id) for var_id in values])
+            if (rows == -1).any():
+                missing = [var_id for var_id, row in zip(values, rows) if row == -1]
+                raise KeyError('Variables not in column mapping: {}'.format(missing))
+
+            column = df.iloc[:, position].values.astype(object)
+            column[rows] = list(values.values())
+            df[df.columns[position]] = column
+
+    def _set_values(self, var_id: tuple, positions: list, values: list):
+        """
+        Set values in the row of a variable.
+
+        :param var_id: tuple of filename and column number.
+        :param positions: column positions to update.
+        :param values: new values, one for each position.
+        """
+        var_id = tuple(var_id)
+        columns = list(self.df.columns[positions])
+        self.df.loc[var_id, columns] = values if len(values) > 1 else values[0]
 
     @staticmethod
     def _df_mods(df):
@@ -202,10 +324,53 @@ class ColumnMapping(FileBase, ValidateMixin):
                 response.append((l[0], l[1]))
         return response
 
+    def _path_diff(self):
+        """
+        Dictionary with variable identifiers as keys and a tuple of old and new
+        concept path as values, for variables that have been added, removed or
+        have a different path since the dataframe was loaded. The frames are joined
+        on variable identifier, only paths with changed components are converted.
+        """
+        if self._initial_paths is None:
+            return {}
+
+        joined = pd.merge(self._initial_paths, self._path_frame(self.df),
+                          on=['filename', 'column'], how='outer',
+                          suffixes=('_a', '_b'), indicator=True)
+        changed = ((joined['_merge'] != 'both') |
+                   (joined['category_code_a'] != joined['category_code_b']) |
+                   (joined['data_label_a'] != joined['data_label_b']))
+        joined = joined[changed]
+
+        def paths(side):
+            present = joined['_merge'] != ('right_only' if side == 'a' else 'left_only')
+            converted = pd.Series('-', index=joined.index)
+            converted[present] = self._concept_paths(joined.loc[present, 'category_code_' + side],
+                                                     joined.loc[present, 'data_label_' + side])
+            return converted
+
+        old_paths, new_paths = paths('a'), paths('b')
+        return {(f, c): (a, b) for f, c, a, b in zip(joined['filename'], joined['column'], old_paths, new_paths)
+                if a != b}
+
+    @staticmethod
+    def _concept_paths(category_codes, data_labels):
+        """
+        Concept paths for series of category codes and data labels, converted
+        with :func:`tmtk.utils.convert_paths`.
+
+        :param category_codes: `pd.Series` with category codes.
+        :param data_labels: `pd.Series` with data labels, same index as category_codes.
+        :return: `pd.Series` with concept paths.
+        """
+        return convert_paths(category_codes + Mappings.PATH_DELIM + data_labels)
+
     @property
     def path_id_dict(self):
         """Dictionary with all variable ids as keys and paths as value."""
-        return {v: self.get_concept_path(v) for v in self.ids}
+        df = self.df
+        paths = self._concept_paths(df.iloc[:, 1], df.iloc[:, 3])
+        return dict(zip(zip(df.iloc[:, 0], df.iloc[:, 2]), paths))
 
     def path_changes(self, silent=False):
         """
@@ -214,7 +379,7 @@ class ColumnMapping(FileBase, ValidateMixin):
         :param silent: if True, only print output.
         :return: if `silent=False` return dictionary with changes since load.
         """
-        diff = column_map_diff(self._initial_paths, self.path_id_dict)
+        diff = self._path_diff()
         if not silent:
             for var_id, item in diff.items():
                 print("{}: {}".format(*var_id))
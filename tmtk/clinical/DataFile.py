@@ -1,9 +1,14 @@
+from collections import namedtuple
+
 import tmtk.utils as utils
 
+ColumnProfile = namedtuple('ColumnProfile', ['numeric', 'min', 'max', 'unique', 'is_empty'])
+
 
 class DataFile(utils.FileBase):
     """
-    Class for clinical data files, does not do much more than tmkt.FileBase.
+    Class for clinical data files. Adds cached statistics of columns
+    to tmkt.FileBase.
     """
 
     def __init__(self, path=None):
@@ -13,5 +18,49 @@ class DataFile(utils.FileBase):
         :param path: path to datafile.
         """
         self.path = path
+        self._profile_cache = {}
         super().__init__()
 
+    def column_profile(self, column: int):
+        """
+        Statistics of a column: values converted to floats (None if the column
+        is not numeric), minimum and maximum of those floats, unique values and
+        whether the column has only missing values. These are cached until the
+        digest of the column changes, so changes made in place are picked up.
+
+        :param column: zero based column index.
+        :return: `ColumnProfile`.
+        """
+        values = self.df.iloc[:, column]
+        digest = self._column_hash(values)
+        cached = self._profile_cache.get(column)
+        if cached is not None and cached[0] == digest:
+            return cached[1]
+
+        numeric = utils.as_numeric(values)
+        profile = ColumnProfile(numeric=numeric,
+                                min=numeric.min() if numeric is not None else None,
+                                max=numeric.max() if numeric is not None else None,
+                                unique=values.unique(),
+                                is_empty=bool((values.isnull() | (values == '')).all()))
+        self._profile_cache[column] = digest, profile
+        return profile
+
+    def numeric_values(self, column: int):
+        """
+        Values of a column converted to floats. The dataframe itself keeps the
+        original strings, the conversion is cached.
+
+        :param column: zero based column index.
+        :return: `pd.Series` with floats, or None if the column is not numeric.
+        """
+        return self.column_profile(column).numeric
+
+    def is_numeric(self, column: int):
+        """
+        True if all values in a column can be converted to floats.
+
+        :param column: zero based column index.
+        :return: bool.
+        """
+        return self.numeric_values(column) is not None
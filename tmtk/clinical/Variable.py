@@ -1,4 +1,4 @@
-from ..utils import Mappings, path_converter, ReservedKeywordException, is_not_a_value
+from ..utils import Mappings, path_converter, ReservedKeywordException, as_numeric
 
 import pandas as pd
 
@@ -117,7 +117,7 @@ class Variable:
 
         :return: Unique set of values in the datafile.
         """
-        return self.values.unique()
+        return self.datafile.column_profile(self._zero_column).unique
 
     @property
     def var_id(self):
@@ -134,21 +134,15 @@ class Variable:
 
         :return: bool.
         """
-        try:
-            set(map(float, self.values))
-            return True
-        except (ValueError, TypeError):
-            return False
+        return self.datafile.is_numeric(self._zero_column)
 
     @property
     def min(self):
-        if self.is_numeric_in_datafile:
-            return min(set(map(float, self.values)))
+        return self.datafile.column_profile(self._zero_column).min
 
     @property
     def max(self):
-        if self.is_numeric_in_datafile:
-            return max(set(map(float, self.values)))
+        return self.datafile.column_profile(self._zero_column).max
 
     @property
     def is_numeric(self):
@@ -164,11 +158,7 @@ class Variable:
         if not self.is_in_wordmap:
             return self.is_numeric_in_datafile
         else:
-            try:
-                set(map(float, self.mapped_values))
-                return True
-            except (ValueError, TypeError):
-                return False
+            return as_numeric(self.mapped_values) is not None
 
     @property
     def is_empty(self):
@@ -177,7 +167,7 @@ class Variable:
 
         :return: bool.
         """
-        return self.values.apply(is_not_a_value).all()
+        return self.datafile.column_profile(self._zero_column).is_empty
 
     @property
     def concept_path(self):
@@ -239,7 +229,7 @@ class Variable:
 
         :return: dict.
         """
-        values = set(self.values)
+        values = self.unique_values
         d = dict(zip(values, values))
         d.update(self.parent.WordMapping.get_word_map(self.var_id))
         return d
@@ -280,7 +270,7 @@ class Variable:
 
         :return: bool.
         """
-        return tuple(self.var_id) in self.parent.WordMapping.df.index
+        return self.parent.WordMapping.has_word_map(self.var_id)
     
     def word_mapped_not_present(self):
         """
@@ -288,20 +278,8 @@ class Variable:
 
         :return: set.
         """
-        if not self.is_in_wordmap:
-            return set()
-
-        mapped_value_column = self.parent.WordMapping.df.columns[2]
-
-        t_index = tuple(self.var_id)
-        mapped_values = self.parent.WordMapping.df.loc[t_index, mapped_value_column]
-
-        if type(mapped_values) != str:
-            mapped_values = set(mapped_values)
-        else:
-            mapped_values = {mapped_values}
-
-        return mapped_values - set(self.values)
+        word_map = self.parent.WordMapping.get_word_map(self.var_id)
+        return set(word_map) - set(self.unique_values)
 
     @property
     def header(self):
@@ -369,11 +347,8 @@ class Variable:
         :param str label: data label.
         :return list: a list of variables.
         """
-        vars_ = self.parent.find_variables_by_label(label, self.var_id.filename)
-        inclusion_criteria = (None, pd.np.nan, '')
-        return [var for var in vars_
-                if var.reference_column in inclusion_criteria
-                or str(self.column) in str(var.reference_column).split(',')]
+        return [self.parent.get_variable(var_id)
+                for var_id in self.parent.ColumnMapping.keyword_ids(label, self.var_id)]
 
     def _get_one_or_none(self, label: str):
         """
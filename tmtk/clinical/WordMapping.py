@@ -2,13 +2,14 @@ import os
 
 import pandas as pd
 
-from ..utils import FileBase, Exceptions, Mappings, word_map_diff, ValidateMixin
+from ..utils import FileBase, Exceptions, Mappings, ValidateMixin
 from ..params import ClinicalParams
 
 
 class WordMapping(FileBase, ValidateMixin):
     """
-    Class representing the word mapping file.
+    Class representing the word mapping file. Word maps are kept as a dictionary
+    of dictionaries, changes are only written to the dataframe when it is requested.
     """
 
     def __init__(self, params=None):
@@ -19,6 +20,10 @@ class WordMapping(FileBase, ValidateMixin):
         """
 
         self.params = params
+        self._word_maps = None
+        self._word_map_digests = None
+        self._df_outdated = False
+        self._initial_word_map = None
 
         if not isinstance(params, ClinicalParams):
             raise Exceptions.ClassError(type(params))
@@ -29,7 +34,102 @@ class WordMapping(FileBase, ValidateMixin):
             self.params.__dict__['WORD_MAP_FILE'] = os.path.basename(self.path)
 
         super().__init__()
-        self._initial_word_map = self.word_map_dicts
+
+    @property
+    def df(self):
+        """The pd.DataFrame for this file object."""
+        if self._df_outdated:
+            self._df_outdated = False
+            FileBase.df.fset(self, self._word_maps_to_df())
+            self._word_map_digests = self._column_hashes(self._df)
+        return self._df
+
+    @df.setter
+    def df(self, value):
+        if not self.df_is_loaded:
+            self._df  # Load the baseline for word_map_changes first.
+        self._df_outdated = False
+        FileBase.df.fset(self, value)
+        self._word_maps = None
+
+    @property
+    def _word_map_lookup(self):
+        """
+        Dictionary with variable identifier tuples as keys and word map dicts as
+        values. Changes made with :meth:`set_word_maps` are made to this dictionary
+        first. Otherwise it is rebuilt from the dataframe when the digests of the
+        dataframe columns differ, so changes made in place are picked up.
+        """
+        if self._df_outdated:
+            return self._word_maps
+
+        df = self.df
+        digests = self._column_hashes(df)
+        if self._word_maps is None or digests != self._word_map_digests:
+            word_maps = {}
+            for filename, column, value, mapped in zip(df.iloc[:, 0], df.iloc[:, 1], df.iloc[:, 2], df.iloc[:, 3]):
+                word_maps.setdefault((filename, column), {})[value] = mapped
+            self._word_maps = word_maps
+            self._word_map_digests = digests
+        return self._word_maps
+
+    def _df_loaded(self, df):
+        self._initial_word_map = self._word_map_frame(df)
+
+    @staticmethod
+    def _word_map_frame(df):
+        """
+        Copy of a word mapping dataframe with a default index and one row per
+        variable identifier and value.
+        """
+        frame = pd.DataFrame({'filename': df.iloc[:, 0].values,
+                              'column': df.iloc[:, 1].values,
+                              'value': df.iloc[:, 2].values,
+                              'mapped': df.iloc[:, 3].values},
+                             columns=['filename', 'column', 'value', 'mapped'], dtype=object)
+        return frame.drop_duplicates(['filename', 'column', 'value'], keep='last')
+
+    def _word_map_diff(self):
+        """
+        Dictionary with variable identifiers as keys and dictionaries with changed
+        values as values, for word maps that have been added, removed or changed
+        since the dataframe was loaded. Word maps of variables that were added or
+        removed are given in full. For changed word maps, new values are given as
+        value -> mapped, removed values as mapped -> value and changed values as
+        old mapped -> new mapped. The old and new frames are joined on variable
+        identifier and value, so only changed rows are looked at in Python.
+        """
+        if self._initial_word_map is None:
+            return {}
+
+        joined = pd.merge(self._initial_word_map, self._word_map_frame(self.df),
+                          on=['filename', 'column', 'value'], how='outer',
+                          suffixes=('_a', '_b'), indicator=True)
+
+        var_ids = pd.MultiIndex.from_arrays([joined['filename'], joined['column']])
+        joined['var_in_b'] = var_ids.isin(var_ids[(joined['_merge'] != 'left_only').values])
+        joined = joined[(joined['_merge'] != 'both') | (joined['mapped_a'] != joined['mapped_b'])]
+
+        diff = {}
+        for f, c, value, a, b, merge, var_in_b in zip(joined['filename'], joined['column'], joined['value'],
+                                                      joined['mapped_a'], joined['mapped_b'],
+                                                      joined['_merge'], joined['var_in_b']):
+            d = diff.setdefault((f, c), {})
+            if merge == 'right_only':
+                d[value] = b
+            elif not var_in_b:
+                d[value] = a
+            elif merge == 'left_only':
+                d[a] = value
+            else:
+                d[a] = b
+        return diff
+
+    def _word_maps_to_df(self):
+        rows = [[var_id[0], var_id[1], value, mapped]
+                for var_id, word_map in self._word_map_lookup.items()
+                for value, mapped in word_map.items()]
+        return pd.DataFrame(rows, columns=self._df.columns, dtype=object)
 
     def _validate_dimensions(self):
         if self.df.shape[1] != 4:
@@ -43,17 +143,16 @@ class WordMapping(FileBase, ValidateMixin):
         :param var_id: tuple of filename and column number.
         :return: dict.
         """
-        var_id = tuple(var_id)
+        return dict(self._word_map_lookup.get(tuple(var_id), {}))
 
-        if var_id in self.df.index:
-            rows = self.df.loc[var_id]
-            if isinstance(rows, pd.DataFrame):
-                return dict(zip(rows.iloc[:, 2], rows.iloc[:, 3]))
-            else:
-                return {rows[2]: rows[3]}
+    def has_word_map(self, var_id):
+        """
+        Check whether a variable has a word map.
 
-        else:
-            return {}
+        :param var_id: tuple of filename and column number.
+        :return: bool.
+        """
+        return tuple(var_id) in self._word_map_lookup
 
     def set_word_map(self, var_id, d):
         """
@@ -62,16 +161,28 @@ class WordMapping(FileBase, ValidateMixin):
         :param var_id: variable identifier tuple.
         :param d: dictionary that contains the value map.
         """
-        var_id = tuple(var_id)
+        self.set_word_maps({var_id: d})
 
-        self.df.drop(var_id, inplace=True, errors='ignore')
+    def set_word_maps(self, word_maps: dict):
+        """
+        Set the word mappings for many variables at once. Existing mappings for
+        these variables are replaced. The dataframe is rebuilt once, when it is
+        requested next.
 
-        self.df = self.df.append(
-                        pd.DataFrame(
-                            [[var_id[0], var_id[1], k, v] for k, v in d.items()],
-                            columns=self.df.columns
-                        ),
-                        ignore_index=True)
+        :param word_maps: dictionary with variable identifier tuples as keys and
+            dictionaries that contain the value map as values.
+        """
+        if not word_maps:
+            return
+
+        lookup = self._word_map_lookup
+        for var_id, d in word_maps.items():
+            var_id = tuple(var_id)
+            if d:
+                lookup[var_id] = dict(d)
+            else:
+                lookup.pop(var_id, None)
+        self._df_outdated = True
 
     @property
     def included_datafiles(self):
@@ -117,7 +228,7 @@ class WordMapping(FileBase, ValidateMixin):
     @property
     def word_map_dicts(self):
         """Dictionary with all variable ids as keys and word map dicts as value."""
-        return {t: self.get_word_map(t) for t in self.df.index}
+        return {var_id: dict(word_map) for var_id, word_map in self._word_map_lookup.items()}
 
     def word_map_changes(self, silent=False):
         """
@@ -126,7 +237,7 @@ class WordMapping(FileBase, ValidateMixin):
         :param silent: if True, only print output.
         :return: if `silent=False` return dictionary with changes since load.
         """
-        diff = word_map_diff(self._initial_word_map, self.word_map_dicts)
+        diff = self._word_map_diff()
         if not silent:
             for var_id, d in diff.items():
                 print("{}: {}".format(*var_id))
@@ -36,16 +36,19 @@ class CopyNumberVariation(HighDimBase):
         bad_regions = []
         bad_samples = []
         everything_okay = True
+        samples = set(self.samples)
 
-        for sample in set(self.samples):
-            columns = self.header.str.contains(sample + '.prob')
-            sample_df = self.df.iloc[:, columns].astype(float)
-            not_full_nan = ~sample_df.isnull().all(axis=1)
-            not_near_1 = ~sample_df.sum(axis=1).between(0.99, 1.01) & not_full_nan
-            if any(not_near_1):
-                everything_okay = False
-                bad_samples.append(sample)
-                [bad_regions.append(x) for x in self.df.loc[not_near_1, self.df.columns[0]]]  # Adds region ids to list.
+        for block in self._numeric_blocks():
+            for sample in samples:
+                columns = block.columns.str.contains(sample + '.prob')
+                sample_df = block.iloc[:, columns]
+                not_full_nan = ~sample_df.isnull().all(axis=1)
+                not_near_1 = ~sample_df.sum(axis=1).between(0.99, 1.01) & not_full_nan
+                if any(not_near_1):
+                    everything_okay = False
+                    if sample not in bad_samples:
+                        bad_samples.append(sample)
+                    bad_regions.extend(block.index[not_near_1.values])  # Adds region ids to list.
 
         if not everything_okay:
             m = 'Samples ({}) where have regions where CNV probabilities do not approximate 1. ' \
@@ -1,7 +1,7 @@
-from ..utils import path_converter, md5, Mappings, PathError, FileBase, ValidateMixin
+from ..utils import path_converter, md5, Mappings, PathError, FileBase, ValidateMixin, RegistryMixin
 
 
-class HighDim(ValidateMixin):
+class HighDim(ValidateMixin, RegistryMixin):
     """
     Container class for all High Dimensional data types.
 
@@ -15,7 +15,7 @@ class HighDim(ValidateMixin):
         for p in params_list:
             new_instance = Mappings.get_highdim(p.datatype)
             try:
-                self.__dict__[p.subdir] = new_instance(p, parent=parent)
+                setattr(self, p.subdir, new_instance(p, parent=parent))
             except PathError:
                 continue
 
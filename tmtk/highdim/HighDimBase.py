@@ -1,17 +1,27 @@
 import pandas as pd
+import numpy as np
 import os
 
 from .SampleMapping import SampleMapping
+from .NumericMatrix import NumericMatrix
+from ..options import options
 
-from ..utils import FileBase, ValidateMixin, PathError, ClassError, TransmartBatch, summarise
+from ..utils import (FileBase, ValidateMixin, RegistryMixin, PathError, ClassError, TransmartBatch, summarise,
+                     chunks2file)
 from ..annotation import ChromosomalRegions
 
 
-class HighDimBase(FileBase, ValidateMixin):
+class HighDimBase(FileBase, ValidateMixin, RegistryMixin):
     """
     Base class for high dimensional data structures.
     """
 
+    # Number of rows read at once when iterating over the data file in chunks.
+    CHUNK_SIZE = 10000
+
+    # Only numerical values and identifiers, nothing to convert when writing.
+    _path_columns = ()
+
     def __init__(self, params=None, path=None, parent=None):
         """
 
@@ -43,6 +53,97 @@ class HighDimBase(FileBase, ValidateMixin):
     def __repr__(self):
         return 'HighDim: {} ({})'.format(self.params.datatype, self.params.dirname)
 
+    @property
+    def _data_on_disk(self):
+        """True if data has to be read from the data file, as the dataframe has not been loaded."""
+        return not self.df_is_loaded and bool(self.path) and os.path.exists(self.path)
+
+    def iter_chunks(self, chunksize=None, numeric=True):
+        """
+        Iterate over the data in blocks of rows, so the full data file never has
+        to be in memory. If the dataframe has already been loaded, or has been set,
+        this iterates over slices of self.df instead.
+
+        :param chunksize: number of rows per block, defaults to self.CHUNK_SIZE.
+        :param numeric: if True, convert all columns except the first (row identifiers)
+            to floats. Columns that cannot be converted are kept as is.
+        :return: generator of `pd.DataFrame`.
+        """
+        chunksize = chunksize or self.CHUNK_SIZE
+
+        if self._data_on_disk:
+            chunks = pd.read_table(self.path, sep='\t', dtype=object, chunksize=chunksize)
+        else:
+            chunks = (self.df.iloc[i:i + chunksize] for i in range(0, self.df.shape[0], chunksize))
+
+        for chunk in chunks:
+            yield self._to_numeric(chunk) if numeric else chunk
+
+    def matrix(self, dtype=np.float64):
+        """
+        Numerical values of this data file as `NumericMatrix`. If the dataframe
+        has not been loaded, the data file is converted to a memory mapped
+        array once, see :meth:`NumericMatrix.from_datafile`.
+
+        :param dtype: numpy float type, e.g. np.float32 to halve memory usage.
+        :return: `NumericMatrix`.
+        """
+        if self._data_on_disk:
+            return NumericMatrix.from_datafile(self, dtype=dtype)
+        return NumericMatrix.from_frame(self.df, dtype=dtype)
+
+    def _numeric_blocks(self):
+        """
+        Blocks of rows with numerical values, indexed by row identifier. These come
+        from the memory mapped matrix if options.highdim_memmap is True, else from
+        :meth:`iter_chunks`.
+
+        :return: generator of `pd.DataFrame`.
+        """
+        if options.highdim_memmap:
+            yield from self.matrix().iter_frames(self.CHUNK_SIZE)
+        else:
+            for chunk in self.iter_chunks():
+                yield chunk.set_index(chunk.columns[0])
+
+    @classmethod
+    def _to_numeric(cls, chunk):
+        """
+        Convert all but the first column of a chunk to floats.
+
+        :param chunk: `pd.DataFrame`.
+        :return: `pd.DataFrame`.
+        """
+        try:
+            values = chunk.iloc[:, 1:].astype(float)
+        except (ValueError, TypeError):
+            values = pd.concat([cls._column_to_numeric(chunk.iloc[:, i]) for i in range(1, chunk.shape[1])],
+                               axis=1)
+        return pd.concat([chunk.iloc[:, :1], values], axis=1)
+
+    @staticmethod
+    def _column_to_numeric(column):
+        try:
+            return column.astype(float)
+        except (ValueError, TypeError):
+            return column
+
+    def write_to(self, path, overwrite=False):
+        """
+        Write data file to path. If the dataframe has not been loaded, the data
+        file is streamed in chunks instead of loading it into memory. Chunks go to a
+        temporary file that replaces path at the end, so path can be the data file itself.
+
+        :param path: path to write file to.
+        :param overwrite: write over existing files in the filesystem)
+        :return: `WriteStats` with number of rows and bytes written.
+        """
+        if self.df_is_loaded:
+            return super().write_to(path, overwrite=overwrite)
+
+        return chunks2file(self.iter_chunks(numeric=False), path,
+                           overwrite=overwrite, path_columns=self._path_columns)
+
     def _check_header_extensions(self):
 
         illegal_header_items = []
@@ -80,7 +181,8 @@ class HighDimBase(FileBase, ValidateMixin):
         elif not isinstance(destination, pd.DataFrame):
             raise ClassError(found=type(destination), expected='pd.DataFrame, or ChromosomalRegions')
 
-        remapped = remap_chromosomal_regions(datafile=self.df,
+        datafile = self.matrix() if options.highdim_memmap else self.df
+        remapped = remap_chromosomal_regions(datafile=datafile,
                                              origin_platform=self.annotation_file.df,
                                              destination_platform=destination)
         return remapped
@@ -95,7 +197,8 @@ class HighDimBase(FileBase, ValidateMixin):
         return {self.params.path: (len(self.sample_mapping.samples), self.path)}
 
     def _validate_missing_annotation(self):
-        missing_annotations = list(self.df.iloc[:, 0][~self.df.iloc[:, 0].isin(self.annotation_file.biomarkers)])
+        row_ids = self.get_column(0)
+        missing_annotations = list(row_ids[~row_ids.isin(self.annotation_file.biomarkers)])
 
         if missing_annotations:
             self.msgs.warning('Missing annotations found.', warning_list=missing_annotations)
@@ -103,7 +206,8 @@ class HighDimBase(FileBase, ValidateMixin):
             self.msgs.okay('All data items have associated annotations.')
 
     def _validate_missing_data_items(self):
-        missing_data = list(self.annotation_file.biomarkers[~self.annotation_file.biomarkers.isin(self.df.iloc[:, 0])])
+        biomarkers = self.annotation_file.biomarkers
+        missing_data = list(biomarkers[~biomarkers.isin(self.get_column(0))])
 
         if not missing_data:
             self.msgs.okay('The entire annotation platform seems to have associated data.')
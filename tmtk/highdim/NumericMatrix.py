@@ -0,0 +1,135 @@
+import os
+import numpy as np
+import pandas as pd
+
+from ..options import options
+from ..utils import cached_property
+from ..utils.df_cache import cache_file_path, remove_stale_cache_files, evict_df_cache, remove_cache_file
+
+
+class NumericMatrix:
+    """
+    Numerical values of a high dimensional data file as a two dimensional numpy
+    array, with the row identifiers (first column) and the header kept apart.
+    When created from a data file on disk, the values are memory mapped, so
+    slicing them does not copy data into memory.
+    """
+
+    def __init__(self, values, row_ids, columns):
+        """
+        :param values: two dimensional numpy array (or memmap) with all values.
+        :param row_ids: numpy array with identifiers for every row.
+        :param columns: full header, i.e. name of the row identifier column and sample columns.
+        """
+        self.values = values
+        self.row_ids = row_ids
+        self.columns = pd.Index(columns)
+
+    def __repr__(self):
+        return 'NumericMatrix ({} x {}, {})'.format(self.shape[0], self.shape[1], self.values.dtype)
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+    @property
+    def sample_ids(self):
+        """Header without the row identifier column."""
+        return self.columns[1:]
+
+    @cached_property
+    def row_index(self):
+        return pd.Index(self.row_ids)
+
+    def row_positions(self, row_ids):
+        """
+        Positions of rows that have any of the given identifiers.
+
+        :param row_ids: iterable of row identifiers.
+        :return: numpy array with integer positions.
+        """
+        return np.flatnonzero(self.row_index.isin(list(row_ids)))
+
+    def iter_frames(self, chunksize):
+        """
+        Iterate over blocks of rows as `pd.DataFrame` indexed by row identifier.
+        The frames are views on self.values.
+
+        :param chunksize: number of rows per block.
+        :return: generator of `pd.DataFrame`.
+        """
+        for i in range(0, self.shape[0], chunksize):
+            yield pd.DataFrame(self.values[i:i + chunksize],
+                               index=pd.Index(self.row_ids[i:i + chunksize], name=self.columns[0]),
+                               columns=self.sample_ids,
+                               copy=False)
+
+    @classmethod
+    def from_frame(cls, df, dtype=np.float64):
+        """
+        Create an in memory matrix from a dataframe where the first column
+        holds row identifiers. Values that are not numerical become NaN.
+
+        :param df: `pd.DataFrame`.
+        :param dtype: numpy float type.
+        :return: `NumericMatrix`.
+        """
+        values = df.iloc[:, 1:].apply(pd.to_numeric, errors='coerce').values.astype(dtype)
+        return cls(values, df.iloc[:, 0].values.astype(str), df.columns)
+
+    @classmethod
+    def from_datafile(cls, highdim, dtype=np.float64):
+        """
+        Create a memory mapped matrix for a high dimensional data file. The file
+        is converted once in chunks and stored in options.cache_dir, next time
+        the stored matrix is used as long as the data file has not been modified.
+
+        :param highdim: `tmtk.highdim.HighDimBase` object.
+        :param dtype: numpy float type.
+        :return: `NumericMatrix`.
+        """
+        dtype = np.dtype(dtype)
+        values_path = cache_file_path(highdim.path, '.{}.npy'.format(dtype.name))
+        rows_path = cache_file_path(highdim.path, '.rows.npy')
+
+        if os.path.exists(values_path) and os.path.exists(rows_path):
+            # Modification time is used to evict least recently used files.
+            for path in (values_path, rows_path):
+                os.utime(path, None)
+        else:
+            cls._convert(highdim, dtype, values_path, rows_path)
+
+        return cls(np.load(values_path, mmap_mode='r'), np.load(rows_path), highdim.header)
+
+    @staticmethod
+    def _convert(highdim, dtype, values_path, rows_path):
+        os.makedirs(options.cache_dir, exist_ok=True)
+        for extension in ('.{}.npy'.format(dtype.name), '.rows.npy'):
+            remove_stale_cache_files(highdim.path, extension)
+
+        row_ids = highdim.get_column(0).values.astype(str)
+        shape = (len(row_ids), len(highdim.header) - 1)
+
+        # Make room for the new files first, so they are never evicted themselves.
+        evict_df_cache(reserve=int(np.prod(shape)) * dtype.itemsize + row_ids.nbytes,
+                       exclude=(values_path, rows_path))
+
+        tmp_values, tmp_rows = ['{}.{}.tmp'.format(p, os.getpid()) for p in (values_path, rows_path)]
+        try:
+            values = np.lib.format.open_memmap(tmp_values, mode='w+', dtype=dtype, shape=shape)
+            start = 0
+            for chunk in highdim.iter_chunks(numeric=False):
+                end = start + chunk.shape[0]
+                values[start:end] = chunk.iloc[:, 1:].apply(pd.to_numeric, errors='coerce').values
+                start = end
+            values.flush()
+            del values
+
+            with open(tmp_rows, 'wb') as f:
+                np.save(f, row_ids)
+
+            os.replace(tmp_values, values_path)
+            os.replace(tmp_rows, rows_path)
+        finally:
+            remove_cache_file(tmp_values)
+            remove_cache_file(tmp_rows)
@@ -1,6 +1,7 @@
 import os
+import pandas as pd
 
-from ..utils import ValidateMixin, FileBase, md5, path_converter
+from ..utils import ValidateMixin, FileBase, md5, path_converter, convert_paths
 
 
 class SampleMapping(FileBase, ValidateMixin):
@@ -8,6 +9,9 @@ class SampleMapping(FileBase, ValidateMixin):
     Base class for subject sample mapping
     """
 
+    # Concept path column.
+    _path_columns = (8,)
+
     def __init__(self, path=None):
         if not os.path.exists(path):
             self.path = self.create_sample_mapping(path)
@@ -26,22 +30,29 @@ class SampleMapping(FileBase, ValidateMixin):
 
     @property
     def _converted_paths(self):
-        return self.df.apply(self._find_path, axis=1)
+        df = self.df
+        paths = [self._fill_path(*values) for values in zip(df.iloc[:, 8], df.iloc[:, 4], df.iloc[:, 5],
+                                                            df.iloc[:, 6], df.iloc[:, 7])]
+        return convert_paths(pd.Series(paths, index=df.index, dtype=object))
+
+    @classmethod
+    def _find_path(cls, row):
+        return path_converter(cls._fill_path(*row.iloc[[8, 4, 5, 6, 7]]))
 
     @staticmethod
-    def _find_path(row):
-        cp = row.iloc[8]
+    def _fill_path(cp, platform, sample_type, tissue_type, time_point):
+        """ Replace placeholders in the concept path column with values of the row. """
         # Legacy
-        cp = cp.replace('ATTR1', str(row.iloc[6]))
-        cp = cp.replace('ATTR2', str(row.iloc[7]))
+        cp = cp.replace('ATTR1', str(tissue_type))
+        cp = cp.replace('ATTR2', str(time_point))
 
         # Current
-        cp = cp.replace('PLATFORM', str(row.iloc[4]))
-        cp = cp.replace('SAMPLETYPE', str(row.iloc[5]))
-        cp = cp.replace('TISSUETYPE', str(row.iloc[6]))
-        cp = cp.replace('TIMEPOINT', str(row.iloc[7]))
+        cp = cp.replace('PLATFORM', str(platform))
+        cp = cp.replace('SAMPLETYPE', str(sample_type))
+        cp = cp.replace('TISSUETYPE', str(tissue_type))
+        cp = cp.replace('TIMEPOINT', str(time_point))
 
-        return path_converter(cp)
+        return cp
 
     def update_concept_paths(self, path_dict):
         self.df.iloc[:, 8] = self.df.apply(lambda x: self._update_row(x, path_dict), axis=1)
@@ -6,3 +6,4 @@ from .Proteomics import Proteomics
 from .ReadCounts import ReadCounts
 from .Mirna import Mirna
 from .SampleMapping import SampleMapping
+from .NumericMatrix import NumericMatrix
@@ -14,6 +14,7 @@ def type_validator(type_):
 
 is_bool = type_validator(bool)
 is_str = type_validator(str)
+is_int = type_validator(int)
 
 
 class OptionWrapper:
@@ -106,3 +107,55 @@ register_option('arborist_url',
                 doc='\nNot used currently.',
                 validator=is_str)
 
+
+cache_dataframes_doc = """
+If True, dataframes parsed from tab separated files are stored in a binary
+cache in options.cache_dir. Next time the same file is loaded the cached
+dataframe is used, as long as the file on disk has not been modified.
+Cached dataframes are unpickled, so only enable this if nobody else can
+write to options.cache_dir.
+"""
+register_option('cache_dataframes',
+                default=False,
+                doc=cache_dataframes_doc,
+                validator=is_bool)
+
+cache_dir_doc = """
+Directory used to store cached dataframes. By default this is the 
+$TMTK_CACHE_DIR environment variable or ~/.cache/tmtk.
+"""
+register_option('cache_dir',
+                default=os.environ.get('TMTK_CACHE_DIR',
+                                       os.path.join(os.path.expanduser('~'), '.cache', 'tmtk')),
+                doc=cache_dir_doc,
+                validator=is_str)
+
+cache_max_size_doc = """
+Maximum size of the dataframe cache directory in megabytes. When the cache
+grows beyond this size, least recently used files are removed.
+"""
+register_option('cache_max_size',
+                default=2048,
+                doc=cache_max_size_doc,
+                validator=is_int)
+
+highdim_memmap_doc = """
+If True, validation and remapping of high dimensional data use a numeric
+matrix that is converted once from the data file and memory mapped from
+options.cache_dir, instead of loading the data file as dataframe.
+"""
+register_option('highdim_memmap',
+                default=False,
+                doc=highdim_memmap_doc,
+                validator=is_bool)
+
+skinny_date_format_doc = """
+Format of date values in clinical data, e.g. '%Y-%m-%d', used to convert dates
+to timestamps when exporting to transmart-copy files. Parsing with a format is
+faster. Dates that do not match are still converted. If empty, the format is
+guessed for every date variable.
+"""
+register_option('skinny_date_format',
+                default='',
+                doc=skinny_date_format_doc,
+                validator=is_str)
@@ -2,10 +2,10 @@ import os
 
 from pathlib import Path
 
-from ..utils import Mappings, clean_for_namespace, ValidateMixin, Message
+from ..utils import Mappings, clean_for_namespace, ValidateMixin, Message, RegistryMixin
 
 
-class Params(ValidateMixin):
+class Params(ValidateMixin, RegistryMixin):
     """
     Container class for all params files, called by Study to locate all params files.
     """
@@ -55,7 +55,7 @@ class Params(ValidateMixin):
         params = self.create_params(path, parameters, subdir=subdir)
 
         if params:
-            self.__dict__[subdir] = params
+            setattr(self, subdir, params)
 
         return params
 
@@ -1,6 +1,7 @@
 import pandas as pd
 import os
-from ..utils import Exceptions, FileBase, Mappings, path_converter, TransmartBatch, ValidateMixin, path_join
+from ..utils import (Exceptions, FileBase, Mappings, path_converter, convert_paths, TransmartBatch,
+                     ValidateMixin, path_join)
 from ..params import TagsParams
 
 
@@ -26,7 +27,13 @@ class MetaDataTags(FileBase, ValidateMixin):
         """
         Return tag paths delimited by the path_converter.
         """
-        return self.df.iloc[:, 0].apply(lambda x: self._convert_path(x))
+        paths = self.df.iloc[:, 0]
+        starts_with_delim = paths.str.startswith(Mappings.PATH_DELIM) | paths.str.startswith(Mappings.EXT_PATH_DELIM)
+        converted = convert_paths(paths)
+
+        # Put back the delimiter if it was removed by the path_converter.
+        converted[starts_with_delim] = Mappings.EXT_PATH_DELIM + converted[starts_with_delim]
+        return converted.str.strip()
 
     @property
     def invalid_paths(self):
@@ -36,8 +43,8 @@ class MetaDataTags(FileBase, ValidateMixin):
         study_paths = [node.path for node in self.parent.concept_tree.nodes if node.type != 'tag']
 
         # Add delimiter to both paths comparing so tag_path only matches if a complete node is matched
-        study_paths = ['{0}{1}{0}'.format(delimiter, path_converter(path)) for path in study_paths]
-        study_paths = ['{0}{1}{0}'.format(delimiter, path_converter(path)) for path in study_paths]
+        study_paths = ['{0}{1}{0}'.format(delimiter, path) for path in convert_paths(study_paths)]
+        study_paths = ['{0}{1}{0}'.format(delimiter, path) for path in convert_paths(study_paths)]
 
         # Add study level path (no nodes)
         study_paths.append(delimiter)
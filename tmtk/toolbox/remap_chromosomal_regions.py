@@ -1,5 +1,7 @@
 import pandas as pd
 
+from ..highdim.NumericMatrix import NumericMatrix
+
 
 def remap_chromosomal_regions(origin_platform=None, destination_platform=None, datafile=None,
                               flag_indicator='.flag', to_dest=2, start_dest=3, end_dest=4,
@@ -87,9 +89,24 @@ def map_index_to_region_ids(gene, origin_platform, region_origin):
 
 
 def return_mean(datafile, mapping, flag_columns=None):
+    if isinstance(datafile, NumericMatrix):
+        return _return_matrix_mean(datafile, mapping, flag_columns)
     mapped_regions = pd.DataFrame(datafile[datafile.iloc[:, 0].isin(mapping)])
     mean_values = mapped_regions.iloc[:, 1:].applymap(float).mean()
     if flag_columns.any() and (len(mapping) > 1):
         mean_values[flag_columns] = (datafile[datafile.iloc[:, 0].isin(mapping)][flag_columns]
                                      ).apply(lambda x: pd.value_counts(x).index[0])
     return mean_values
+
+
+def _return_matrix_mean(matrix, mapping, flag_columns=None):
+    """
+    Same as return_mean, but only the rows of the mapped regions are read
+    from a (memory mapped) `NumericMatrix`.
+    """
+    positions = matrix.row_positions(mapping)
+    mapped_regions = pd.DataFrame(matrix.values[positions], columns=matrix.sample_ids)
+    mean_values = mapped_regions.mean()
+    if flag_columns.any() and (len(mapping) > 1):
+        mean_values[flag_columns] = mapped_regions[flag_columns].apply(lambda x: pd.value_counts(x).index[0])
+    return mean_values
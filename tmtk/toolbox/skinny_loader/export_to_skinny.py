@@ -9,6 +9,7 @@ from .i2b2demodata.trial_visit_dimension import TrialVisitDimension
 from .i2b2metadata.dimension_descriptions import DimensionDescription
 from .i2b2metadata.study_dimension_descriptions import StudyDimensionDescription
 from .i2b2metadata.i2b2_tags import I2B2Tags
+from .writers import get_writer, part_path
 
 import os
 
@@ -68,22 +69,35 @@ class SkinnyExport:
         # Observation fact has to be created explicitly, because it is the only expensive operation
         self.observation_fact = None
 
-    def to_disk(self):
+    def to_disk(self, workers=1, output_format='tsv', compression=None, max_rows=None, max_bytes=None):
+        """
+        Write all tables to export_directory.
+
+        :param workers: number of processes used to create the observation fact table,
+            see :meth:`observation_fact_to_disk`.
+        :param output_format: 'tsv' (default) for transmart-copy, 'pgcopy' for the
+            PostgreSQL binary copy format or 'parquet' (requires pyarrow).
+        :param compression: None (default), 'gzip' or 'zstd' (requires zstandard) to
+            compress all tables while writing.
+        :param max_rows: split the observation fact table in parts of at most max_rows rows.
+        :param max_bytes: split the observation fact table in parts of about max_bytes bytes.
+        """
+        writer = get_writer(output_format)
 
         demo = 'i2b2demodata'
         meta = 'i2b2metadata'
 
         attribute_to_disk_map = {
-            'i2b2_secure': (meta, 'i2b2_secure.tsv'),
-            'i2b2_tags': (meta, 'i2b2_tags.tsv'),
-            'concept_dimension': (demo, 'concept_dimension.tsv'),
-            'patient_dimension': (demo, 'patient_dimension.tsv'),
-            'patient_mapping': (demo, 'patient_mapping.tsv'),
-            'study_table': (demo, 'study.tsv'),
-            'trial_visit_dimension': (demo, 'trial_visit_dimension.tsv'),
-            'modifier_dimension': (demo, 'modifier_dimension.tsv'),
-            'dimension_description': (meta, 'dimension_description.tsv'),
-            'study_dimension_descriptions': (meta, 'study_dimension_descriptions.tsv')
+            'i2b2_secure': (meta, 'i2b2_secure'),
+            'i2b2_tags': (meta, 'i2b2_tags'),
+            'concept_dimension': (demo, 'concept_dimension'),
+            'patient_dimension': (demo, 'patient_dimension'),
+            'patient_mapping': (demo, 'patient_mapping'),
+            'study_table': (demo, 'study'),
+            'trial_visit_dimension': (demo, 'trial_visit_dimension'),
+            'modifier_dimension': (demo, 'modifier_dimension'),
+            'dimension_description': (meta, 'dimension_description'),
+            'study_dimension_descriptions': (meta, 'study_dimension_descriptions')
         }
         self._ensure_dirs()
         for attribute, file_tuple in attribute_to_disk_map.items():
@@ -92,21 +106,41 @@ class SkinnyExport:
 
             if not table_obj:
                 continue
-            path = os.path.join(self.export_directory, file_tuple[0], file_tuple[1])
-            with open(path, 'w') as f:
-                print('Writing table to disk: {}'.format(path))
-                table_obj.df.to_csv(f, sep='\t', index=False)
+            path = os.path.join(self.export_directory, file_tuple[0],
+                                file_tuple[1] + writer.file_extension(compression))
+            print('Writing table to disk: {}'.format(path))
+            with writer(path, table_obj.df.columns, table_obj.column_types, compression=compression) as w:
+                w.write(table_obj.df)
 
-        self.observation_fact_to_disk()
+        self.observation_fact_to_disk(workers=workers, output_format=writer, compression=compression,
+                                      max_rows=max_rows, max_bytes=max_bytes)
 
     def build_observation_fact(self):
         self.observation_fact = ObservationFact(self)
 
-    def observation_fact_to_disk(self):
+    def observation_fact_to_disk(self, workers=1, output_format='tsv', compression=None,
+                                 max_rows=None, max_bytes=None):
+        """
+        Write the observation fact table to export_directory without keeping it in memory.
+
+        :param workers: number of processes, if more than one the variables of each
+            clinical data file are processed in a separate process.
+        :param output_format: 'tsv', 'pgcopy' or 'parquet', see :meth:`to_disk`.
+        :param compression: None, 'gzip' or 'zstd', see :meth:`to_disk`.
+        :param max_rows: if set, write numbered part files of at most max_rows rows,
+            e.g. observation_fact.part-00000.tsv.
+        :param max_bytes: if set, start a new part file once a part is max_bytes on disk.
+        """
+        writer = get_writer(output_format)
         self._ensure_dirs()
-        path = os.path.join(self.export_directory, 'i2b2demodata', 'observation_fact.tsv')
-        print('Writing table to disk: {}'.format(path))
-        ObservationFact(self, straight_to_disk=path)
+        path = os.path.join(self.export_directory, 'i2b2demodata',
+                            'observation_fact' + writer.file_extension(compression))
+        if max_rows is not None or max_bytes is not None:
+            print('Writing table to disk: {}'.format(part_path(path, '*')))
+        else:
+            print('Writing table to disk: {}'.format(path))
+        ObservationFact(self, straight_to_disk=path, workers=workers, output_format=writer,
+                        compression=compression, max_rows=max_rows, max_bytes=max_bytes)
 
     def _ensure_dirs(self):
         if self.export_directory:
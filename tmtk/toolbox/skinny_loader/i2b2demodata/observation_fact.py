@@ -1,4 +1,14 @@
-from ..shared import TableRow, Defaults, get_full_path, get_unix_timestamp
+from ..shared import TableRow, Defaults, get_full_path, get_unix_timestamps
+from ..writers import get_writer, SplitWriter
+from ....options import options
+from ....utils import Message
+
+import os
+import shutil
+import tempfile
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 
 import pandas as pd
 import arrow
@@ -6,9 +16,30 @@ from tqdm import tqdm
 
 MISSING_VALUE_MOD = 'MISSVAL'  # Special case modifier where empty observations should be added to database
 
+# ObservationFact that is being written by a pool of forked worker processes, see
+# ObservationFact.write_to_disk. Workers inherit it instead of unpickling the whole study.
+_forked_observation_fact = None
+
+
+def _write_part(task):
+    """
+    Write the observation fact rows of a group of variables to a fragment, or
+    to complete part files if split_options are given. Returns the parts written.
+    """
+    var_ids, path, writer, split_options = task
+    fact = _forked_observation_fact
+    variables = [fact.study.Clinical.get_variable(var_id) for var_id in var_ids]
+    if split_options:
+        output = SplitWriter(writer, path, fact.columns, fact.column_types, **split_options)
+    else:
+        output = writer(path, fact.columns, fact.column_types, fragment=True)
+    fact._write_blocks(fact.iter_blocks(variables=variables), output)
+    return output.parts if split_options else [(path, output.rows)]
+
 
 class ObservationFact(TableRow):
-    def __init__(self, skinny, straight_to_disk=False):
+    def __init__(self, skinny, straight_to_disk=False, workers=1, output_format='tsv',
+                 compression=None, max_rows=None, max_bytes=None):
 
         self.skinny = skinny
         self.study = skinny.study
@@ -21,29 +52,151 @@ class ObservationFact(TableRow):
         if not straight_to_disk:
             self._build_in_memory()
         else:
-            self.write_to_disk(straight_to_disk)
+            self.write_to_disk(straight_to_disk, workers=workers, output_format=output_format,
+                               compression=compression, max_rows=max_rows, max_bytes=max_bytes)
 
     def _build_in_memory(self):
+        self.df = next(self.iter_blocks(chunksize=None))
 
-        dfs = []
-        # Loop through all variables in the clinical data and add a row
-        for variable in tqdm(self.study.Clinical.filtered_variables.values()):
-            dfs += [r for r in self.build_rows(variable)]
+    def write_to_disk(self, path, workers=1, output_format='tsv', compression=None, max_rows=None, max_bytes=None):
+        """
+        Write the observation fact table to path. If max_rows or max_bytes is set, the
+        table is split over numbered part files instead, e.g. observation_fact.part-00000.tsv,
+        see :class:`tmtk.toolbox.skinny_loader.writers.SplitWriter`.
+
+        :param path: path to write to.
+        :param workers: number of processes. If more than one, variables are partitioned
+            by data file and each data file is handled by a separate process. Rows are
+            then ordered by data file, in order of first appearance in the column mapping.
+        :param output_format: 'tsv', 'pgcopy' or 'parquet', see
+            :mod:`tmtk.toolbox.skinny_loader.writers`.
+        :param compression: None (default), 'gzip' or 'zstd' to compress while writing.
+        :param max_rows: maximum number of rows per part file.
+        :param max_bytes: size in bytes after which a new part file is started.
+        :return: paths of the files written.
+        """
+        writer = get_writer(output_format)
+        split_options = None
+        if max_rows is not None or max_bytes is not None:
+            split_options = {'compression': compression, 'max_rows': max_rows, 'max_bytes': max_bytes}
 
-        self.df = pd.concat(dfs, ignore_index=True)
+        if workers > 1 and 'fork' not in multiprocessing.get_all_start_methods():
+            Message.warning('Forking processes is not supported on this platform, using a single process.')
+            workers = 1
 
-    def write_to_disk(self, path):
-        with open(path, 'w') as f:
-            f.write('\t'.join(self.columns) + '\n')
-            for variable in tqdm(self.study.Clinical.filtered_variables.values()):
-                for df in self.build_rows(variable):
-                    df.to_csv(f, sep='\t', index=False, header=False)
+        if workers > 1:
+            return self._write_to_disk_parallel(path, workers, writer, compression, split_options)
+
+        if split_options:
+            output = SplitWriter(writer, path, self.columns, self.column_types, **split_options)
+        else:
+            output = writer(path, self.columns, self.column_types, compression=compression)
+        self._write_blocks(self.iter_blocks(), output)
+        return output.paths if split_options else [path]
+
+    @staticmethod
+    def _write_blocks(blocks, writer):
+        with writer:
+            for block in blocks:
+                writer.write(block)
+
+    def _write_to_disk_parallel(self, path, workers, writer, compression, split_options):
+        global _forked_observation_fact
+
+        var_ids = OrderedDict()
+        for var_id, variable in self.study.Clinical.filtered_variables.items():
+            var_ids.setdefault(variable.filename, []).append(var_id)
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_dir = tempfile.mkdtemp(dir=os.path.dirname(os.path.abspath(path)))
+        # With split_options every worker writes complete part files, which are renumbered
+        # afterwards. Otherwise workers write uncompressed fragments that are merged.
+        extension = writer.file_extension(compression) if split_options else writer.extension
+        tasks = [(ids, os.path.join(tmp_dir, 'fragment-{:05d}{}'.format(i, extension)), writer, split_options)
+                 for i, ids in enumerate(var_ids.values())]
+
+        _forked_observation_fact = self
+        try:
+            context = multiprocessing.get_context('fork')
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+                parts = [part for task_parts in tqdm(executor.map(_write_part, tasks), total=len(tasks))
+                         for part in task_parts]
+
+            if split_options:
+                return SplitWriter.collect(parts, path)
+            writer.merge([part for part, _ in parts], path, self.columns, self.column_types,
+                         compression=compression)
+            return [path]
+        finally:
+            _forked_observation_fact = None
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    def iter_blocks(self, chunksize=100000, variables=None):
+        """
+        Generates the observation fact table in large blocks. Rows for variables are
+        collected as arrays and only turned into a `pd.DataFrame` once a block holds
+        at least chunksize rows. Rows are in the same order as :meth:`build_rows`
+        for all variables. At least one (possibly empty) block is generated.
+
+        :param chunksize: minimum number of rows per block, if None generate a single block.
+        :param variables: variables to generate rows for, defaults to all filtered variables.
+        :return: generator of `pd.DataFrame`.
+        """
+        if variables is None:
+            variables = tqdm(self.study.Clinical.filtered_variables.values())
+
+        parts, n_rows, n_blocks = [], 0, 0
+        for variable in variables:
+            for data, keep in self.build_parts(variable):
+                parts.append((data, keep))
+                n_rows += int(keep.sum())
+
+            if chunksize and n_rows >= chunksize:
+                yield self._parts_to_df(parts)
+                parts, n_rows, n_blocks = [], 0, n_blocks + 1
+
+        if parts or not n_blocks:
+            yield self._parts_to_df(parts)
+
+    def _parts_to_df(self, parts):
+        """
+        Concatenate parts from :meth:`build_parts` column by column into a single
+        `pd.DataFrame`. Columns keep the dtype they have in every part, if parts
+        disagree the column becomes object so values are written as before.
+        """
+        data = {}
+        for column in self.columns:
+            arrays = []
+            for part, keep in parts:
+                value = part.get(column, pd.np.nan)
+                if isinstance(value, pd.np.ndarray):
+                    arrays.append(value[keep])
+                else:
+                    dtype = object if value is None or isinstance(value, str) else None
+                    arrays.append(pd.np.full(int(keep.sum()), value, dtype=dtype))
+
+            if len({a.dtype for a in arrays}) > 1:
+                arrays = [a.astype(object) for a in arrays]
+            data[column] = pd.np.concatenate(arrays) if arrays else pd.np.array([], dtype=object)
+
+        return pd.DataFrame(data, columns=self.columns)
 
     def build_rows(self, var) -> pd.DataFrame:
         """
         Returns all observation fact rows for a given variable as multiple pd.DataFrames.
         It returns a DataFrame for all normal observations and one for each applicable modifier.
         """
+        for part in self.build_parts(var):
+            yield self._parts_to_df([part])
+
+    def build_parts(self, var):
+        """
+        Returns all observation fact rows for a given variable as a list of tuples with
+        a dictionary and a boolean array. The dictionary maps columns to a scalar or an
+        array with a value for every row in the data file, the array selects the rows
+        that are observations. The first tuple has the normal observations, followed
+        by one for each applicable modifier.
+        """
 
         def get_value_fields(values, visual_attributes_):
             """
@@ -56,33 +209,34 @@ class ObservationFact(TableRow):
             if visual_attributes_ == var.VIS_DATE:
                 return {'valtype_cd': 'D',
                         'tval_char': 'E',
-                        'nval_num': values.apply(get_unix_timestamp),  # Unix time
-                        'observation_blob': values}  # UTC
+                        'nval_num': get_unix_timestamps(values, options.skinny_date_format),  # Unix time
+                        'observation_blob': values.values}  # UTC
 
             elif visual_attributes_ == var.VIS_TEXT:
                 return {'valtype_cd': 'B',
                         'tval_char': pd.np.nan,
                         'nval_num': pd.np.nan,
-                        'observation_blob': values}
+                        'observation_blob': values.values}
 
             elif visual_attributes_ == var.VIS_NUMERIC:
                 return {'valtype_cd': 'N',
                         'tval_char': 'E',
-                        'nval_num': values,
+                        'nval_num': values.values,
                         'observation_blob': pd.np.nan}
 
             elif visual_attributes_ == var.VIS_CATEGORICAL:
                 return {'valtype_cd': 'T',
-                        'tval_char': values,
+                        'tval_char': values.values,
                         'nval_num': pd.np.nan,
                         'observation_blob': pd.np.nan}
 
         # Preload these, so we don't have to get them for every value in the current variable
         modifiers = var.modifiers
         start_date = var.start_date
+        mapped_values = var.mapped_values
 
         if var.trial_visit:
-            trial_visit_num = var.trial_visit.values.map(self.skinny.trial_visit_dimension.get_num)
+            trial_visit_num = var.trial_visit.values.map(self.skinny.trial_visit_dimension.get_num).values
         else:
             trial_visit_num = self.skinny.trial_visit_dimension.get_num(Defaults.TRIAL_VISIT)
 
@@ -96,75 +250,54 @@ class ObservationFact(TableRow):
         try:
             internal_subj_ids = self._subject_id_cache[var.filename]
         except KeyError:
-            internal_subj_ids = var.subj_id.values.map(self.skinny.patient_mapping.map)
+            internal_subj_ids = var.subj_id.values.map(self.skinny.patient_mapping.map).values
             self._subject_id_cache[var.filename] = internal_subj_ids
 
         var_wide_data = {
             'encounter_num': -1,
             # Find the internal identifiers for a given series of external identifiers
             'patient_num': internal_subj_ids,
-            'concept_cd': var.concept_code or self.skinny.concept_dimension.map.get(var_full_path),
+            'concept_cd': concept_code,
             'provider_id': '@',
-            'start_date': start_date.values if start_date else None,
+            'start_date': start_date.values.values if start_date else None,
             'modifier_cd': '@',
             'trial_visit_num': trial_visit_num,
             # because of poorly suited primary key on observation_fact
             # we are forced to use instance_num to adhere to unique constraint.
-            'instance_num': range(len(var.values))
+            'instance_num': pd.np.arange(len(mapped_values))
         }
 
-        var_wide_data.update(
-            get_value_fields(var.mapped_values, var.visual_attributes)
-        )
-
-        # This dataframe contains all normal values, but also rows for missing values.
-        main_df = pd.DataFrame(var_wide_data, columns=self.columns)
+        # This contains all normal values, but also rows for missing values.
+        main_data = dict(var_wide_data, **get_value_fields(mapped_values, var.visual_attributes))
+        main_value_present = mapped_values.notnull().values
 
         if not modifiers:
             # Keep only observations that respond are non pd.np.nan
-            main_df = main_df.loc[var.mapped_values.notnull()]
-            yield main_df
-
-        else:
-            # We have to also return the rows for the applicable modifier
-            # variables and cleanup of empty observations is a bit more complicated.
-            # Container for DataFrames for the applicable modifier variables.
-            modifier_dfs = []
-
-            for modifier_variable in modifiers:
-                var_wide_data['modifier_cd'] = modifier_variable.modifier_code
-
-                var_wide_data.update(
-                    get_value_fields(modifier_variable.mapped_values, modifier_variable.visual_attributes)
-                )
-                modifier_dfs.append(pd.DataFrame(var_wide_data, columns=self.columns))
-
-            # To cleanup of 'empty' observations, we first remove observations that are empty
-            # themselves and have no MISSVAL modifier with a value either. The rule here is that
-            # if any observation exists for a given patient/concept (etc..) combination, we keep the
-            # empty observation. Modifiers without value will always be dropped.
-            missing_value_present = [mod.mapped_values.notnull() for mod in modifiers
-                                     if mod.modifier_code == MISSING_VALUE_MOD]
-            main_value_present = var.mapped_values.notnull()
-
-            main_and_missing = missing_value_present + [main_value_present]
-
-            any_present = pd.DataFrame(main_and_missing).any()
-
-            # subset on boolean series
-            main_df = main_df.loc[any_present]
-            yield main_df
-
-            # Strip modifier DataFrames of empty observations
-            for i, modifier_variable in enumerate(modifiers):
-                mod_df = modifier_dfs[i]
-                load_mod_value = modifier_variable.mapped_values.notnull()
-
-                if modifier_variable.modifier_code != MISSING_VALUE_MOD:
-                    load_mod_value = load_mod_value & main_value_present
-
-                mod_df = mod_df.loc[load_mod_value]
-                yield mod_df
+            return [(main_data, main_value_present)]
+
+        # We have to also return the rows for the applicable modifier
+        # variables and cleanup of empty observations is a bit more complicated.
+        # To cleanup of 'empty' observations, we first remove observations that are empty
+        # themselves and have no MISSVAL modifier with a value either. The rule here is that
+        # if any observation exists for a given patient/concept (etc..) combination, we keep the
+        # empty observation. Modifiers without value will always be dropped.
+        any_present = main_value_present.copy()
+        modifier_parts = []
+        for modifier_variable in modifiers:
+            modifier_values = modifier_variable.mapped_values
+            load_mod_value = modifier_values.notnull().values
+
+            if modifier_variable.modifier_code == MISSING_VALUE_MOD:
+                any_present |= load_mod_value
+            else:
+                load_mod_value = load_mod_value & main_value_present
+
+            modifier_data = dict(var_wide_data,
+                                 modifier_cd=modifier_variable.modifier_code,
+                                 **get_value_fields(modifier_values, modifier_variable.visual_attributes))
+            modifier_parts.append((modifier_data, load_mod_value))
+
+        return [(main_data, any_present)] + modifier_parts
 
     @property
     def _row_definition(self):
@@ -222,6 +355,35 @@ class ObservationFact(TableRow):
                 'sample_cd',
             ])
 
+    @property
+    def column_types(self):
+        return {
+            'encounter_num': 'numeric(38,0)',
+            'patient_num': 'numeric(38,0)',
+            'concept_cd': 'varchar(50)',
+            'provider_id': 'varchar(50)',
+            'start_date': 'timestamp',
+            'modifier_cd': 'varchar(100)',
+            'instance_num': 'numeric(18,0)',
+            'trial_visit_num': 'numeric(38,0)',
+            'valtype_cd': 'varchar(50)',
+            'tval_char': 'varchar(255)',
+            'nval_num': 'numeric(18,5)',
+            'valueflag_cd': 'varchar(50)',
+            'quantity_num': 'numeric(18,5)',
+            'units_cd': 'varchar(50)',
+            'end_date': 'timestamp',
+            'location_cd': 'varchar(50)',
+            'observation_blob': 'text',
+            'confidence_num': 'numeric(18,5)',
+            'update_date': 'timestamp',
+            'download_date': 'timestamp',
+            'import_date': 'timestamp',
+            'sourcesystem_cd': 'varchar(50)',
+            'upload_id': 'int4',
+            'sample_cd': 'varchar(200)',
+        }
+
     @property
     def primary_key(self):
         return [
@@ -8,33 +8,12 @@ class PatientDimension(TableRow):
         self.study = study
         super().__init__()
 
-        # Due to implementation details on pd.from_dict() method we need to add
-        # something to the patients dictionary if neither age or gender are present.
-        patient_dict = self.study.Clinical.get_patients()
-        patient_dict.update({p: {'age': pd.np.nan} for p, v in patient_dict.items() if not v})
+        patients = self.study.Clinical.get_patients_df()
 
-        self.df = pd.DataFrame.from_dict(patient_dict, orient='index')
-        self.df.reset_index(drop=False, inplace=True)
-
-        # Due to non deterministic behaviour of dictionaries need to check the order
-        # in the temporary dataframe.
-        new_columns = list(self.df.columns)
-        new_columns[0] = 'sourcesystem_cd'
-
-        try:
-            new_columns[new_columns.index('age')] = 'age_in_years_num'
-
-            # Database will round, so we have to floor age here.
-            self.df.age = self.df.age.astype(pd.np.float64) // 1
-        except ValueError:
-            pass
-
-        try:
-            new_columns[new_columns.index('gender')] = 'sex_cd'
-        except ValueError:
-            pass
-
-        self.df.columns = new_columns
+        self.df = pd.DataFrame({'sourcesystem_cd': patients.index,
+                                # Database will round, so we have to floor age here.
+                                'age_in_years_num': pd.to_numeric(patients['age'], errors='coerce').values // 1,
+                                'sex_cd': patients['gender'].values})
 
         self.df = self.df.reindex(columns=self.columns)
 
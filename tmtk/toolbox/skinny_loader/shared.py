@@ -1,8 +1,15 @@
 from ...utils import path_converter
 
+from datetime import datetime, timedelta, timezone
+
 import arrow
 import pandas as pd
 
+# Guessing the format from the first value makes parsing a column much faster,
+# newer pandas versions always do this.
+_INFER_FORMAT = {'infer_datetime_format': True} if int(pd.__version__.split('.')[0]) < 2 else {}
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
 class TableRow:
     """ Used as base class to create table rows from a pd.Series object defined in child class. """
 
@@ -38,6 +45,14 @@ class TableRow:
         """
         return self.row.keys()
 
+    @property
+    def column_types(self):
+        """
+        PostgreSQL types of columns in this table, used by binary output formats.
+        Columns that are not in this dictionary get a type based on their dtype.
+        """
+        return {}
+
 
 class Defaults:
 
@@ -75,3 +90,39 @@ def get_unix_timestamp(date):
             return pd.np.nan
     else:
         return pd.np.nan
+
+
+def _arrow_milliseconds(date):
+    """ Milliseconds since epoch parsed by arrow, for dates pandas cannot handle. """
+    try:
+        return (arrow.get(date).datetime - _EPOCH) // timedelta(milliseconds=1)
+    except Exception:
+        return pd.np.nan
+
+
+def get_unix_timestamps(values, date_format=None):
+    """
+    Convert a whole column of dates to milliseconds since epoch, as transmart needs.
+    Every distinct value is parsed only once. Dates without timezone are taken to
+    be UTC. Dates outside the range of `pd.Timestamp` are parsed by arrow.
+
+    :param values: `pd.Series` with dates, numbers are taken as seconds since epoch.
+    :param date_format: optional strftime format of the dates, e.g. '%Y-%m-%d'.
+    :return: float array with milliseconds, nan for empty and unparseable dates.
+    """
+    if pd.api.types.is_numeric_dtype(values):
+        return pd.to_numeric(values).values * 1000.0
+
+    codes, uniques = pd.factorize(values)
+    uniques = pd.Series(uniques)
+    if date_format:
+        timestamps = pd.to_datetime(uniques, format=date_format, errors='coerce', utc=True)
+    else:
+        timestamps = pd.to_datetime(uniques, errors='coerce', utc=True, **_INFER_FORMAT)
+
+    milliseconds = ((timestamps - pd.Timestamp(0, tz='UTC')) // pd.Timedelta(milliseconds=1)).astype(float)
+    failed = timestamps.isnull() & uniques.notnull()
+    milliseconds[failed] = uniques[failed].map(_arrow_milliseconds)
+
+    # Codes are -1 for missing values, those end up at the nan appended here.
+    return pd.np.append(milliseconds.values, pd.np.nan)[codes]
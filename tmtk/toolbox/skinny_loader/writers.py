@@ -0,0 +1,620 @@
+import glob
+import gzip
+import os
+import shutil
+import struct
+from decimal import Decimal
+
+import pandas as pd
+
+
+class TableWriter:
+    """
+    Base class for writers of export tables. Data is written to a temporary file
+    next to path, which replaces path when the writer is closed, so path is never
+    left half written. Use as context manager:
+
+        with TsvWriter(path, columns) as writer:
+            writer.write(df)
+
+    A writer created with fragment=True only writes rows, without the header or
+    trailer of the format. Fragments written by separate processes can be
+    combined with :meth:`merge`.
+
+    Output is streamed through gzip or zstd compression if compression is set,
+    see :func:`open_compressed`.
+    """
+
+    extension = None
+
+    def __init__(self, path, columns, column_types=None, fragment=False, compression=None):
+        """
+        :param path: path to write to.
+        :param columns: names of all columns, in order.
+        :param column_types: dictionary with PostgreSQL type for columns, e.g. 'int4',
+            'numeric(18,5)', 'varchar(50)', 'text' or 'timestamp'. Columns without
+            a type get one based on the dtype of the first dataframe written.
+        :param fragment: if True, do not write header and trailer.
+        :param compression: None (default), 'gzip' or 'zstd'.
+        """
+        if compression not in COMPRESSION_EXTENSIONS:
+            raise ValueError('Unknown compression {!r}, choose from: {}'.format(
+                compression, ', '.join(c for c in COMPRESSION_EXTENSIONS if c)))
+
+        self.path = path
+        self.columns = list(columns)
+        self.column_types = dict(column_types or {})
+        self.fragment = fragment
+        self.compression = compression
+        self.rows = 0
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+        self._raw = None
+        self._file = None
+        self._open()
+
+    @classmethod
+    def file_extension(cls, compression=None):
+        """
+        Extension of files written by this writer, including that of the compression.
+
+        :param compression: None, 'gzip' or 'zstd'.
+        :return: extension, e.g. '.tsv.gz'.
+        """
+        return cls.extension + COMPRESSION_EXTENSIONS[compression]
+
+    @property
+    def bytes_written(self):
+        """ Number of bytes written to disk so far, after compression. """
+        return self._raw.tell() if self._raw is not None else 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def _open(self):
+        self._raw = open(self._tmp_path, 'wb')
+        try:
+            self._file = open_compressed(self._raw, self.compression, os.path.basename(self.path))
+        except ImportError:
+            self._raw.close()
+            os.remove(self._tmp_path)
+            raise
+        if not self.fragment:
+            self._write_header()
+
+    def _write_header(self):
+        pass
+
+    def _write_trailer(self):
+        pass
+
+    def _infer_types(self, df):
+        for column, dtype in zip(df.columns, df.dtypes):
+            if column not in self.column_types:
+                self.column_types[column] = infer_column_type(dtype)
+
+    def write(self, df):
+        """
+        Write rows of a dataframe with the columns of this writer.
+
+        :param df: `pd.DataFrame`.
+        """
+        self._infer_types(df)
+        self._write_rows(df)
+        self.rows += len(df)
+
+    def _write_rows(self, df):
+        raise NotImplementedError
+
+    def append_fragment(self, path):
+        """
+        Append all rows from a fragment written by the same kind of writer.
+
+        :param path: path to fragment.
+        """
+        with open(path, 'rb') as f:
+            shutil.copyfileobj(f, self._file)
+
+    def close(self):
+        """ Finish the file and move it to path. """
+        if self._file is None:
+            return
+        if not self.fragment:
+            self._write_trailer()
+        self._close_file()
+        os.replace(self._tmp_path, self.path)
+
+    def _close_file(self):
+        self._file.close()
+        if not self._raw.closed:
+            self._raw.close()
+        self._file = None
+        self._raw = None
+
+    def abort(self):
+        """ Stop writing and remove the temporary file. """
+        if self._file is not None:
+            self._close_file()
+        if os.path.exists(self._tmp_path):
+            os.remove(self._tmp_path)
+
+    @classmethod
+    def merge(cls, fragment_paths, path, columns, column_types=None, compression=None):
+        """
+        Combine uncompressed fragments into a single file.
+
+        :param fragment_paths: paths to fragments, in order.
+        :param path: path to write to.
+        :param columns: names of all columns, in order.
+        :param column_types: dictionary with PostgreSQL type for columns.
+        :param compression: compression of the combined file, None, 'gzip' or 'zstd'.
+        """
+        with cls(path, columns, column_types, compression=compression) as writer:
+            for fragment_path in fragment_paths:
+                writer.append_fragment(fragment_path)
+
+
+COMPRESSION_EXTENSIONS = {
+    None: '',
+    'gzip': '.gz',
+    'zstd': '.zst',
+}
+
+
+def open_compressed(raw, compression, name=None):
+    """
+    Wrap a binary file object in a stream that compresses everything written to it.
+
+    :param raw: binary file object opened for writing.
+    :param compression: None, 'gzip' or 'zstd' (requires zstandard).
+    :param name: file name stored in the gzip header.
+    :return: file object, raw itself if compression is None.
+    """
+    if compression is None:
+        return raw
+    elif compression == 'gzip':
+        # Without modification time, the same data always compresses to the same bytes.
+        return gzip.GzipFile(filename=name, mode='wb', fileobj=raw, mtime=0)
+    elif compression == 'zstd':
+        try:
+            import zstandard
+        except ImportError:
+            raise ImportError('zstd compression requires zstandard, install it with: pip install zstandard')
+        return zstandard.ZstdCompressor().stream_writer(raw)
+    raise ValueError('Unknown compression {!r}'.format(compression))
+
+
+class TsvWriter(TableWriter):
+    """ Tab separated text with a header line, as written by ``pd.DataFrame.to_csv``. """
+
+    extension = '.tsv'
+
+    def _write_header(self):
+        self._file.write(pd.DataFrame(columns=self.columns).to_csv(sep='\t', index=False).encode())
+
+    def _write_rows(self, df):
+        self._file.write(df.to_csv(sep='\t', index=False, header=False).encode())
+
+
+# Signature, flags and header extension length of the PostgreSQL binary copy format.
+PGCOPY_HEADER = b'PGCOPY\n\xff\r\n\x00' + struct.pack('>ii', 0, 0)
+PGCOPY_TRAILER = struct.pack('>h', -1)
+PGCOPY_NULL = struct.pack('>i', -1)
+
+_PG_EPOCH = pd.Timestamp('2000-01-01')
+
+_FIXED_WIDTH_TYPES = {
+    'int2': '>h',
+    'int4': '>i',
+    'integer': '>i',
+    'int8': '>q',
+    'bigint': '>q',
+    'float4': '>f',
+    'float8': '>d',
+    'bool': '>?',
+    'boolean': '>?',
+}
+
+
+def infer_column_type(dtype):
+    """
+    PostgreSQL type for a numpy dtype: bigint, double precision, boolean or text.
+
+    :param dtype: numpy dtype.
+    :return: type name.
+    """
+    if pd.api.types.is_bool_dtype(dtype):
+        return 'bool'
+    elif pd.api.types.is_integer_dtype(dtype):
+        return 'int8'
+    elif pd.api.types.is_float_dtype(dtype):
+        return 'float8'
+    return 'text'
+
+
+def _base_type(pg_type):
+    return pg_type.split('(')[0].strip().lower()
+
+
+def _encode_numeric(value):
+    """ Binary representation of a value for a PostgreSQL numeric column. """
+    sign, digits, exponent = Decimal(str(value)).as_tuple()
+    if not isinstance(exponent, int):
+        return struct.pack('>hhHh', 0, 0, 0xC000, 0)
+
+    digits = ''.join(map(str, digits))
+    if exponent >= 0:
+        integer, fraction = digits + '0' * exponent, ''
+    else:
+        digits = digits.rjust(-exponent + 1, '0')
+        integer, fraction = digits[:exponent], digits[exponent:]
+
+    integer = integer.lstrip('0')
+    integer = integer.rjust(-(-len(integer) // 4) * 4, '0')
+    fraction = fraction.ljust(-(-len(fraction) // 4) * 4, '0')
+    groups = [int(integer[i:i + 4]) for i in range(0, len(integer), 4)] + \
+             [int(fraction[i:i + 4]) for i in range(0, len(fraction), 4)]
+
+    weight = len(integer) // 4 - 1
+    while groups and groups[0] == 0:
+        groups.pop(0)
+        weight -= 1
+    while groups and groups[-1] == 0:
+        groups.pop()
+    if not groups:
+        weight = 0
+
+    dscale = max(0, -exponent)
+    return struct.pack('>hhHh{}H'.format(len(groups)), len(groups), weight, 0x4000 if sign else 0, dscale, *groups)
+
+
+def encode_column(values, pg_type):
+    """
+    Encode the values of a column as fields of the PostgreSQL binary copy
+    format, i.e. with a length prefix, NULL for missing values.
+
+    :param values: `pd.Series`.
+    :param pg_type: PostgreSQL type of the target column.
+    :return: list of bytes, one for every value.
+    """
+    base_type = _base_type(pg_type)
+    is_null = pd.isnull(values).values
+    fields = [PGCOPY_NULL] * len(values)
+    present = values[~is_null]
+    positions = (~is_null).nonzero()[0]
+
+    if base_type in _FIXED_WIDTH_TYPES:
+        fmt = struct.Struct('>i' + _FIXED_WIDTH_TYPES[base_type][1:])
+        if base_type.startswith('bool'):
+            converted = present.astype(bool)
+        elif base_type.startswith('float'):
+            converted = pd.to_numeric(present).astype(float)
+        else:
+            converted = pd.to_numeric(present).astype('int64')
+        for position, value in zip(positions, converted.tolist()):
+            fields[position] = fmt.pack(fmt.size - 4, value)
+
+    elif base_type in ('numeric', 'decimal'):
+        for position, value in zip(positions, present.tolist()):
+            encoded = _encode_numeric(value)
+            fields[position] = struct.pack('>i', len(encoded)) + encoded
+
+    elif base_type in ('timestamp', 'date'):
+        timestamps = pd.to_datetime(present)
+        if base_type == 'date':
+            fmt, unit = struct.Struct('>ii'), pd.Timedelta(days=1)
+        else:
+            fmt, unit = struct.Struct('>iq'), pd.Timedelta(microseconds=1)
+        for position, value in zip(positions, ((timestamps - _PG_EPOCH) // unit).tolist()):
+            fields[position] = fmt.pack(fmt.size - 4, value)
+
+    else:
+        for position, value in zip(positions, present.tolist()):
+            encoded = str(value).encode('utf-8')
+            fields[position] = struct.pack('>i', len(encoded)) + encoded
+
+    return fields
+
+
+class PgCopyWriter(TableWriter):
+    """
+    PostgreSQL binary copy format, that can be loaded with
+    ``COPY <table> FROM '<path>' WITH (FORMAT binary)``. Column types have to
+    match the table that is loaded into, see :meth:`TableWriter.__init__`.
+    """
+
+    extension = '.bin'
+
+    def _write_header(self):
+        self._file.write(PGCOPY_HEADER)
+
+    def _write_trailer(self):
+        self._file.write(PGCOPY_TRAILER)
+
+    def _write_rows(self, df):
+        field_count = struct.pack('>h', len(self.columns))
+        encoded = [encode_column(df[column], self.column_types[column]) for column in self.columns]
+        self._file.write(b''.join(field_count + b''.join(fields) for fields in zip(*encoded)))
+
+
+_ARROW_TYPES = {
+    'int2': 'int16',
+    'int4': 'int32',
+    'integer': 'int32',
+    'int8': 'int64',
+    'bigint': 'int64',
+    'float4': 'float32',
+    'float8': 'float64',
+    'bool': 'bool_',
+    'boolean': 'bool_',
+    'timestamp': 'timestamp',
+    'date': 'date32',
+}
+
+
+class ParquetWriter(TableWriter):
+    """
+    Apache Parquet file with a row group for every dataframe written. Requires
+    pyarrow. Columns get the Arrow type that corresponds to their PostgreSQL
+    type, numeric columns become int64 without scale and float64 with scale. Compression
+    is applied by Parquet itself, per column chunk, so files keep their extension.
+    """
+
+    extension = '.parquet'
+
+    def __init__(self, path, columns, column_types=None, fragment=False, compression=None):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise ImportError('Writing Parquet files requires pyarrow, install it with: pip install pyarrow')
+        self._pa = pyarrow
+        self._pq = pyarrow.parquet
+        self._writer = None
+        super().__init__(path, columns, column_types, fragment=fragment, compression=compression)
+
+    def _open(self):
+        # A parquet file is self contained, fragments are complete files as well.
+        self.fragment = False
+
+    @classmethod
+    def file_extension(cls, compression=None):
+        return cls.extension
+
+    @property
+    def bytes_written(self):
+        return os.path.getsize(self._tmp_path) if os.path.exists(self._tmp_path) else 0
+
+    def _arrow_type(self, pg_type):
+        base_type = _base_type(pg_type)
+        if base_type in ('numeric', 'decimal'):
+            # Without precision any scale is allowed, with precision the scale defaults to 0.
+            modifiers = pg_type.partition('(')[2].rstrip(')').split(',')
+            scale = modifiers[1].strip() if len(modifiers) > 1 else '0' if modifiers[0] else None
+            return self._pa.int64() if scale == '0' else self._pa.float64()
+        elif base_type == 'timestamp':
+            return self._pa.timestamp('us')
+        elif base_type in _ARROW_TYPES:
+            return getattr(self._pa, _ARROW_TYPES[base_type])()
+        return self._pa.string()
+
+    def _arrow_array(self, values, arrow_type):
+        pa = self._pa
+        if pa.types.is_string(arrow_type):
+            return pa.array([None if pd.isnull(v) else str(v) for v in values.tolist()], type=arrow_type)
+        elif pa.types.is_timestamp(arrow_type) or pa.types.is_date(arrow_type):
+            return pa.array(pd.to_datetime(values), from_pandas=True).cast(arrow_type)
+        elif pa.types.is_boolean(arrow_type):
+            return pa.array(values, from_pandas=True).cast(arrow_type)
+        return pa.array(pd.to_numeric(values), from_pandas=True).cast(arrow_type)
+
+    def _write_rows(self, df):
+        pa = self._pa
+        schema = pa.schema([(column, self._arrow_type(self.column_types[column])) for column in self.columns])
+        table = pa.Table.from_arrays([self._arrow_array(df[field.name], field.type) for field in schema],
+                                     schema=schema)
+        self._write_table(table)
+
+    def _write_table(self, table):
+        if self._writer is None:
+            options = {'compression': self.compression} if self.compression else {}
+            self._writer = self._pq.ParquetWriter(self._tmp_path, table.schema, **options)
+        self._writer.write_table(table)
+
+    def append_fragment(self, path):
+        table = self._pq.read_table(path)
+        self._write_table(table)
+        self.rows += table.num_rows
+
+    def close(self):
+        if self._writer is None:
+            # Nothing written, still create a file with the right columns.
+            self.write(pd.DataFrame(columns=self.columns))
+        self._writer.close()
+        self._writer = None
+        os.replace(self._tmp_path, self.path)
+
+    def abort(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        if os.path.exists(self._tmp_path):
+            os.remove(self._tmp_path)
+
+
+def part_path(path, number):
+    """
+    Path of a numbered part of a split file, the number is placed before the
+    extensions, e.g. observation_fact.tsv.gz becomes observation_fact.part-00003.tsv.gz.
+
+    :param path: path of the unsplit file.
+    :param number: number of the part, starting at 0, or a string to put in its place.
+    :return: path.
+    """
+    directory, filename = os.path.split(path)
+    name, dot, extension = filename.partition('.')
+    number = number if isinstance(number, str) else '{:05d}'.format(number)
+    return os.path.join(directory, '{}.part-{}{}{}'.format(name, number, dot, extension))
+
+
+def _remove_other_parts(path, keep):
+    """ Remove parts of path left by an earlier export that are not in keep. """
+    directory, filename = os.path.split(path)
+    pattern = part_path(os.path.join(glob.escape(directory), glob.escape(filename)), '[0-9]' * 5)
+    for existing in glob.glob(pattern):
+        if existing not in keep:
+            os.remove(existing)
+
+
+class SplitWriter:
+    """
+    Writes a table to numbered part files, see :func:`part_path`, starting a new
+    part once it holds max_rows rows or max_bytes bytes. Every part is a complete
+    file that can be loaded on its own. Parts are filled one dataframe at a time,
+    so a part can be larger than max_bytes by up to one dataframe. Parts of an
+    earlier export of the same path that are not overwritten are removed on close.
+
+        with SplitWriter(TsvWriter, path, columns, compression='gzip', max_rows=10**7) as writer:
+            writer.write(df)
+    """
+
+    def __init__(self, writer, path, columns, column_types=None, compression=None, max_rows=None, max_bytes=None):
+        """
+        :param writer: `TableWriter` subclass or output format, see :func:`get_writer`.
+        :param path: path of the unsplit file, parts are numbered from this.
+        :param columns: names of all columns, in order.
+        :param column_types: dictionary with PostgreSQL type for columns.
+        :param compression: None, 'gzip' or 'zstd'.
+        :param max_rows: maximum number of rows per part.
+        :param max_bytes: number of bytes on disk after which a new part is started.
+        """
+        if max_rows is not None and max_rows < 1:
+            raise ValueError('max_rows has to be at least 1.')
+        self.writer = get_writer(writer)
+        self.path = path
+        self.columns = list(columns)
+        self.column_types = column_types
+        self.compression = compression
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.parts = []
+        self._current = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    @property
+    def paths(self):
+        """ Paths of parts written so far. """
+        return [path for path, _ in self.parts]
+
+    @property
+    def rows(self):
+        """ Number of rows written to all parts. """
+        return sum(rows for _, rows in self.parts) + (self._current.rows if self._current else 0)
+
+    def _is_full(self):
+        return ((self.max_rows is not None and self._current.rows >= self.max_rows) or
+                (self.max_bytes is not None and self._current.bytes_written >= self.max_bytes))
+
+    def _close_part(self):
+        if self._current is not None:
+            self._current.close()
+            self.parts.append((self._current.path, self._current.rows))
+            self._current = None
+
+    def _next_part(self):
+        self._close_part()
+        self._current = self.writer(part_path(self.path, len(self.parts)), self.columns, self.column_types,
+                                    compression=self.compression)
+
+    def write(self, df):
+        """
+        Write rows of a dataframe, over as many parts as needed.
+
+        :param df: `pd.DataFrame`.
+        """
+        start = 0
+        while True:
+            if self._current is None or self._is_full():
+                self._next_part()
+            stop = len(df)
+            if self.max_rows is not None:
+                stop = min(stop, start + self.max_rows - self._current.rows)
+            self._current.write(df.iloc[start:stop])
+            start = stop
+            if start >= len(df):
+                break
+
+    def close(self):
+        """ Finish the last part, creating an empty part if nothing was written. """
+        if self._current is None and not self.parts:
+            self._next_part()
+        self._close_part()
+        _remove_other_parts(self.path, self.paths)
+
+    def abort(self):
+        """ Stop writing and remove all parts written so far. """
+        if self._current is not None:
+            self._current.abort()
+            self._current = None
+        for path in self.paths:
+            if os.path.exists(path):
+                os.remove(path)
+        self.parts = []
+
+    @classmethod
+    def collect(cls, parts, path):
+        """
+        Move parts written by separate SplitWriters to consecutively numbered
+        parts of path, skipping empty parts unless all are empty.
+
+        :param parts: list of (path, rows) tuples, in order.
+        :param path: path of the unsplit file.
+        :return: paths of the parts.
+        """
+        non_empty = [part for part, rows in parts if rows] or [part for part, _ in parts[:1]]
+        paths = []
+        for number, part in enumerate(non_empty):
+            paths.append(part_path(path, number))
+            os.replace(part, paths[-1])
+        for part, _ in parts:
+            if part not in non_empty and os.path.exists(part):
+                os.remove(part)
+        _remove_other_parts(path, paths)
+        return paths
+
+
+WRITERS = {
+    'tsv': TsvWriter,
+    'pgcopy': PgCopyWriter,
+    'parquet': ParquetWriter,
+}
+
+
+def get_writer(output_format):
+    """
+    Writer class for an output format.
+
+    :param output_format: one of 'tsv', 'pgcopy' or 'parquet', or a `TableWriter` subclass.
+    :return: `TableWriter` subclass.
+    """
+    if isinstance(output_format, type) and issubclass(output_format, TableWriter):
+        return output_format
+    try:
+        return WRITERS[output_format]
+    except KeyError:
+        raise ValueError('Unknown output format {!r}, choose from: {}'.format(output_format, ', '.join(WRITERS)))
@@ -4,6 +4,8 @@ import random
 from IPython.display import YouTubeVideo
 import hashlib
 import re
+from collections import namedtuple
+from functools import lru_cache
 
 from .Exceptions import *
 from .mappings import Mappings
@@ -48,19 +50,20 @@ def summarise(list_or_dict=None, max_items: int = 7) -> str:
     return m
 
 
-def file2df(path=None):
+def file2df(path=None, **kwargs):
     """
-    Load a file specified by path into a Pandas dataframe.  If hashed is True, return a
-    a (dataframe, hash) value tuple.
+    Load a file specified by path into a Pandas dataframe.
 
     :param path: to file to load
+    :param kwargs: all kwargs are passed on to ``pd.read_table()``, e.g. ``usecols`` or ``nrows``.
     :return: `pd.DataFrame`
     """
     if not os.path.exists(path):
         raise PathError('File ({}) does not exist.'.format(path))
     df = pd.read_table(path,
                        sep='\t',
-                       dtype=object)
+                       dtype=object,
+                       **kwargs)
     return df
 
 
@@ -74,15 +77,43 @@ def md5(s: str):
     return hashlib.md5(s.encode('utf-8')).hexdigest()
 
 
-def df2file(df=None, path=None, overwrite=False, **kwargs):
+WriteStats = namedtuple('WriteStats', ['rows', 'bytes'])
+
+
+def df2file(df=None, path=None, overwrite=False, path_columns=None, chunksize=100000, **kwargs):
     """
     Write a dataframe to file safely.  Does not overwrite existing files
-    automatically. This function converts concept path delimiters.
+    automatically. This function converts concept path delimiters, the
+    dataframe itself is not modified. See :func:`chunks2file` for details.
 
     :param df: `pd.DataFrame`
     :param path: path to write to
     :param overwrite: False (default) or True
+    :param path_columns: positions of columns that can contain concept paths,
+        defaults to all columns with dtype object.
+    :param chunksize: number of rows written at once.
     :param kwargs: all kwargs are passed on to ``pd.DataFrame.to_csv()``
+    :return: `WriteStats` with number of rows and bytes written.
+    """
+    chunks = (df.iloc[i:i + chunksize] for i in range(0, max(len(df), 1), chunksize))
+    return chunks2file(chunks, path, overwrite=overwrite, path_columns=path_columns, **kwargs)
+
+
+def chunks2file(chunks, path=None, overwrite=False, path_columns=None, **kwargs):
+    """
+    Write an iterable of dataframes with the same columns to a single file.
+    Output is written to a temporary file in the same directory that replaces
+    path once all chunks have been written, so path is never left half written.
+
+    Concept path delimiters are only converted in path_columns, if not
+    given all columns with dtype object are inspected.
+
+    :param chunks: iterable of `pd.DataFrame`.
+    :param path: path to write to
+    :param overwrite: False (default) or True
+    :param path_columns: positions of columns that can contain concept paths.
+    :param kwargs: all kwargs are passed on to ``pd.DataFrame.to_csv()``
+    :return: `WriteStats` with number of rows and bytes written.
     """
     if not path:
         raise PathError(path)
@@ -92,12 +123,58 @@ def df2file(df=None, path=None, overwrite=False, **kwargs):
 
     os.makedirs(os.path.dirname(path), exist_ok=True)
 
-    df.replace(Mappings.PATH_DELIM, '\\\\', inplace=True, regex=True)
+    header = kwargs.pop('header', True)
+    encoding = kwargs.pop('encoding', 'utf-8')
+    rows = 0
+    tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+    try:
+        with open(tmp_path, 'w', newline='', encoding=encoding) as f:
+            for i, chunk in enumerate(chunks):
+                _convert_path_delimiters(chunk, path_columns).to_csv(f,
+                                                                     sep='\t',
+                                                                     index=False,
+                                                                     header=header if i == 0 else False,
+                                                                     **kwargs)
+                rows += len(chunk)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    return WriteStats(rows, os.path.getsize(path))
+
+
+def _convert_path_delimiters(df, path_columns=None):
+    """
+    Replace internal path delimiters with the external delimiter. Returns
+    a copy if anything was replaced, else the original dataframe.
 
-    df.to_csv(path,
-              sep='\t',
-              index=False,
-              **kwargs)
+    :param df: `pd.DataFrame`
+    :param path_columns: positions of columns that can contain concept paths.
+    :return: `pd.DataFrame`
+    """
+    if path_columns is None:
+        path_columns = [i for i, dtype in enumerate(df.dtypes) if dtype == object]
+
+    converted = df
+    for i in path_columns:
+        column = df.iloc[:, i]
+        try:
+            has_delimiter = column.str.contains(Mappings.PATH_DELIM, regex=False)
+        except AttributeError:
+            # Object column without any strings.
+            continue
+        has_delimiter = has_delimiter.fillna(False).astype(bool).values
+        if not has_delimiter.any():
+            continue
+
+        if converted is df:
+            converted = df.copy()
+        values = column.values.copy()
+        values[has_delimiter] = [v.replace(Mappings.PATH_DELIM, Mappings.EXT_PATH_DELIM)
+                                 for v in values[has_delimiter]]
+        converted.iloc[:, i] = values
+    return converted
 
 
 def find_fully_unique_columns(df):
@@ -119,6 +196,26 @@ def is_not_a_value(value):
     return value is None or value is pd.np.nan or value == ''
 
 
+def as_numeric(values):
+    """
+    Convert values to floats in one vectorised operation. Missing values stay
+    missing, but if any other value cannot be converted None is returned.
+    Values that `pd.to_numeric` does not accept, e.g. '1_000' or full-width
+    digits, are converted with float() one by one.
+
+    :param values: `pd.Series`.
+    :return: `pd.Series` with floats or None.
+    """
+    numeric = pd.to_numeric(values, errors='coerce').astype(float)
+    failed = numeric.isnull() & values.notnull()
+    if failed.any():
+        try:
+            numeric[failed] = [float(value) for value in values[failed]]
+        except (ValueError, TypeError):
+            return None
+    return numeric
+
+
 def fix_everything():
     """
     Scans over all the data and indicates which errors have been fixed. This
@@ -129,10 +226,20 @@ def fix_everything():
     return YouTubeVideo('dQw4w9WgXcQ', autoplay=True)
 
 
+_ESCAPED_PLUS = re.compile(r'\\*\+')
+_ESCAPED_UNDERSCORE = re.compile(r'\\*_')
+_UNESCAPED_UNDERSCORE = re.compile(r'(?<!\\)_')
+_UNESCAPED_PLUS = re.compile(r'(?<!\\)\+')
+_BACKSLASH_DELIMITER = re.compile(r'\\(?![_+])')
+_REPEATED_DELIMITER = re.compile('{}+'.format(re.escape(Mappings.PATH_DELIM * 2)))
+
+
+@lru_cache(maxsize=2 ** 16)
 def path_converter(path, to_internal=False, from_internal=False):
     """
     Convert paths by creating delimiters of backslash "\" and "+" sign, additionally converting
-    underscores "_" to a single space.
+    underscores "_" to a single space. Results are memoised, so converting the
+    same path again is a dictionary lookup.
 
     :param path: concept path
     :param to_internal: if path is for internal use delimit with Mappings.PATH_DELIM
@@ -144,21 +251,21 @@ def path_converter(path, to_internal=False, from_internal=False):
     # is expected to have come from arborist.
     if from_internal:
         # Make sure all + and _ are escaped
-        path = re.sub('\\\\*\+', '\\+', path)
-        path = re.sub('\\\\*_', '\\_', path)
+        path = _ESCAPED_PLUS.sub(r'\\+', path)
+        path = _ESCAPED_UNDERSCORE.sub(r'\\_', path)
     else:
         # Using negative look behind replace unescaped _ and +
-        path = re.sub('(?<!\\\\)_', ' ', path)
-        path = re.sub('(?<!\\\\)\\+', delimiter, path)
+        path = _UNESCAPED_UNDERSCORE.sub(' ', path)
+        path = _UNESCAPED_PLUS.sub(delimiter, path)
 
     # Use negative look ahead to replace all backslashes not
     # followed by + or _ with a internal delimiter.
-    path = re.sub('\\\\(?![_+])', delimiter, path)
+    path = _BACKSLASH_DELIMITER.sub(delimiter, path)
 
     path = path.strip(delimiter)
 
     # Demultiply the path delimiters
-    path = re.sub(r'{}+'.format(delimiter*2), r'{}'.format(delimiter), path)
+    path = _REPEATED_DELIMITER.sub(delimiter, path)
 
     if to_internal:
         # This way the arborist can operate without escaping
@@ -171,6 +278,24 @@ def path_converter(path, to_internal=False, from_internal=False):
     return path
 
 
+def convert_paths(paths, to_internal=False, from_internal=False):
+    """
+    Apply :func:`path_converter` to a series of paths. Every distinct path is
+    converted once.
+
+    :param paths: `pd.Series` (or other iterable) with concept paths.
+    :param to_internal: if path is for internal use delimit with Mappings.PATH_DELIM
+    :param from_internal: replace + and _ with escaped versions.
+    :return: `pd.Series` with converted paths, with the index of paths.
+    """
+    if not isinstance(paths, pd.Series):
+        paths = pd.Series(list(paths), dtype=object)
+    codes, uniques = pd.factorize(paths)
+    converted = pd.np.array([path_converter(path, to_internal, from_internal) for path in uniques] + [pd.np.nan],
+                            dtype=object)
+    return pd.Series(converted[codes], index=paths.index, name=paths.name)
+
+
 def path_join(*args):
     """
     Join items with the used path delimiter.
@@ -188,6 +313,8 @@ def merge_two_dicts(x, y):
     return z
 
 
+# column_map_diff and word_map_diff are no longer used by ColumnMapping and WordMapping,
+# which diff whole frames, but are kept as part of the public API of tmtk.utils.
 def column_map_diff(a_column, b_column):
 
     column_map = {}
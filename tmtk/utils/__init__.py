@@ -1,10 +1,12 @@
 from .cached_property import cached_property
 from .Generic import (clean_for_namespace, df2file, find_fully_unique_columns, summarise,
-                      file2df, fix_everything, md5, path_converter, path_join, is_not_a_value,
-                      merge_two_dicts, column_map_diff, word_map_diff)
+                      file2df, fix_everything, md5, path_converter, convert_paths, path_join, is_not_a_value,
+                      merge_two_dicts, column_map_diff, word_map_diff, as_numeric, chunks2file)
 from .Exceptions import (PathError, ClassError, DatatypeError, ReservedKeywordException, TooManyValues,
                          BlueprintException, ArboristException)
 from .mappings import Mappings
 from .batch import TransmartBatch
 from .validate import ValidateMixin, Message
+from .df_cache import clear_df_cache, evict_df_cache
 from .filebase import FileBase
+from .registry import Registry, RegistryMixin
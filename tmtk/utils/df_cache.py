@@ -0,0 +1,154 @@
+import os
+import re
+import glob
+import pandas as pd
+
+from .Generic import md5
+from ..options import options
+
+CACHE_EXTENSION = '.pkl'
+
+# Only files named like '<md5 of path>_<md5 of state><extension>' are managed by this module.
+CACHE_FILE_PATTERN = re.compile(r'^[0-9a-f]{32}_[0-9a-f]{32}\.[a-z0-9.]+$')
+
+
+def _cache_prefix(path):
+    """ Prefix for cache files that belong to this path, regardless of its modification state. """
+    return md5(os.path.abspath(path))
+
+
+def cache_file_path(path, extension=CACHE_EXTENSION):
+    """
+    Path to the cache file for the current state of the file in path. The
+    key is build from the absolute path, modification time and size of the file.
+
+    :param path: path to source file.
+    :param extension: extension that identifies the kind of cache file.
+    :return: path to cache file.
+    """
+    stat = os.stat(path)
+    state = md5('{}_{}'.format(stat.st_mtime_ns, stat.st_size))
+    file_name = '{}_{}{}'.format(_cache_prefix(path), state, extension)
+    return os.path.join(options.cache_dir, file_name)
+
+
+def remove_stale_cache_files(path, extension=CACHE_EXTENSION):
+    """
+    Remove cache files of a given kind that belong to older states of the file in path.
+
+    :param path: path to source file.
+    :param extension: extension that identifies the kind of cache file.
+    """
+    current = cache_file_path(path, extension)
+    for f in glob.glob(os.path.join(options.cache_dir, '{}_*{}'.format(_cache_prefix(path), extension))):
+        if f != current:
+            remove_cache_file(f)
+
+
+def get_cached_df(path):
+    """
+    Load a dataframe from cache if it is present for the current state of
+    the file in path.
+
+    :param path: path to source file.
+    :return: `pd.DataFrame` or None if not in cache.
+    """
+    if not options.cache_dataframes:
+        return
+
+    cache_file = cache_file_path(path)
+    if not os.path.exists(cache_file):
+        return
+
+    try:
+        df = pd.read_pickle(cache_file)
+    except Exception:
+        # Corrupt or incompatible cache files are treated as a cache miss.
+        remove_cache_file(cache_file)
+        return
+
+    # Modification time is used to evict least recently used files.
+    os.utime(cache_file, None)
+
+    # Unpickled missing values are separate float objects, put back the
+    # pd.np.nan singleton so they behave like freshly parsed values in sets.
+    for column in df.columns[df.isnull().any().values]:
+        values = df[column].values.copy()
+        values[pd.isnull(values)] = pd.np.nan
+        df[column] = values
+
+    return df
+
+
+def cache_df(path, df):
+    """
+    Store dataframe in cache for the current state of the file in path. Older
+    cache files for the same path are removed, as are least recently used files
+    to make room. Dataframes that would not fit in options.cache_max_size are
+    not stored at all.
+
+    :param path: path to source file.
+    :param df: `pd.DataFrame` as parsed from path.
+    """
+    if not options.cache_dataframes:
+        return
+
+    # Memory usage is a close estimate of the size of the pickled dataframe.
+    size = int(df.memory_usage(index=True, deep=True).sum())
+    if size > options.cache_max_size * 1024 ** 2:
+        return
+
+    cache_file = cache_file_path(path)
+    os.makedirs(options.cache_dir, exist_ok=True)
+    remove_stale_cache_files(path)
+    evict_df_cache(reserve=size)
+
+    tmp_file = '{}.{}.tmp'.format(cache_file, os.getpid())
+    try:
+        df.to_pickle(tmp_file)
+        os.replace(tmp_file, cache_file)
+    except OSError:
+        remove_cache_file(tmp_file)
+
+
+def evict_df_cache(max_size=None, reserve=0, exclude=()):
+    """
+    Remove least recently used files from the cache directory until its
+    total size is below max_size.
+
+    :param max_size: size in megabytes, defaults to options.cache_max_size.
+    :param reserve: number of bytes to keep free for a file that is about to be added.
+    :param exclude: paths of cache files that are in use and must not be removed.
+    """
+    exclude = {os.path.abspath(f) for f in exclude}
+    max_bytes = (options.cache_max_size if max_size is None else max_size) * 1024 ** 2 - reserve
+
+    cache_files = []
+    for f in glob.glob(os.path.join(options.cache_dir, '*')):
+        if not CACHE_FILE_PATTERN.match(os.path.basename(f)) or os.path.abspath(f) in exclude:
+            continue
+        try:
+            stat = os.stat(f)
+        except OSError:
+            continue
+        cache_files.append((stat.st_mtime, stat.st_size, f))
+
+    total = sum(size for _, size, _ in cache_files)
+    for _, size, f in sorted(cache_files):
+        if total <= max_bytes:
+            break
+        remove_cache_file(f)
+        total -= size
+
+
+def clear_df_cache():
+    """ Remove all cached files from options.cache_dir. """
+    evict_df_cache(max_size=0)
+
+
+def remove_cache_file(path):
+    """ Remove a file, ignoring files that are already gone or still in use. """
+    try:
+        os.remove(path)
+    except OSError:
+        pass
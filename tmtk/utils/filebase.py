@@ -1,7 +1,19 @@
 import os
+import shutil
+import hashlib
+import threading
 import pandas as pd
 
+try:
+    from pandas.util import hash_pandas_object
+except ImportError:
+    # pandas < 0.20
+    from pandas.tools.hashing import hash_pandas_object
+
 from . import file2df, df2file, cached_property, Message
+from .Generic import WriteStats
+from .Exceptions import PathError
+from .df_cache import get_cached_df, cache_df
 
 
 class FileBase:
@@ -9,22 +21,51 @@ class FileBase:
     Super class with shared utilities for file objects.
     """
 
+    # Positions of columns that can contain concept paths, these get their path
+    # delimiters converted when writing. None means all columns with strings.
+    _path_columns = None
+
     def __init__(self):
-        self._hash_init = None
+        self._column_hashes_init = None
+        self._lazy_reads = None
+        self._load_lock = threading.RLock()
 
     # The df property is setup like this so dataframe are only loaded from disk on first request.
     # Upon load self._df_mods will be performed if this method has been defined.  After first
     # reading from disk, the results are cached and df will just return the pd.DataFrame.
+    # Parsed files are also kept in an on disk cache, see :mod:`tmtk.utils.df_cache`.
     @cached_property
     def _df(self):
-        if self.path and os.path.exists(self.path) and self.tabs_in_first_line():
-            df = file2df(self.path)
-        else:
-            Message.okay("Creating dataframe for: {}".format(self))
-            df = self.create_df()
-        df = self._df_processing(df)
-        self._hash_init = hash(df.__bytes__())
-        return df
+        return self._load_df()
+
+    def _load_df(self, parsed=None):
+        """
+        Load the dataframe and apply post load modifications. This is done while
+        holding a lock, so a file is loaded once if several threads request the
+        dataframe at the same time.
+
+        :param parsed: dataframe that has already been parsed from the file.
+        :return: `pd.DataFrame`.
+        """
+        with self._load_lock:
+            if '_df' in self.__dict__:
+                return self.__dict__['_df']
+
+            if parsed is not None:
+                df = parsed
+            elif self.path and os.path.exists(self.path) and self.tabs_in_first_line():
+                df = get_cached_df(self.path)
+                if df is None:
+                    df = file2df(self.path)
+                    cache_df(self.path, df)
+            else:
+                Message.okay("Creating dataframe for: {}".format(self))
+                df = self.create_df()
+            df = self._df_processing(df)
+            self._column_hashes_init = self._column_hashes(df)
+            self._df_loaded(df)
+            self.__dict__['_df'] = df
+            return df
 
     @property
     def df(self):
@@ -36,9 +77,21 @@ class FileBase:
         if not isinstance(value, pd.DataFrame):
             raise TypeError('Expected pd.DataFrame object.')
         value = self._df_processing(value)
-        self._hash_init = self._hash_init or 1
         self._df = value
 
+    def _df_loaded(self, df):
+        """
+        Called once after the dataframe has been loaded from disk or created, before
+        any changes can be made to it. Subclasses can use this to keep a baseline.
+
+        :param df: the loaded `pd.DataFrame`.
+        """
+
+    @property
+    def df_is_loaded(self):
+        """True if the dataframe has been loaded from disk, or has been set."""
+        return '_df' in self.__dict__
+
     def _df_processing(self, df):
         """
         Gives df post load modifications
@@ -56,20 +109,104 @@ class FileBase:
             pass
         return df
 
+    @staticmethod
+    def _column_hash(column):
+        """
+        Digest for the values of a single column. Row order is taken into account.
+
+        :param column: `pd.Series`.
+        :return: str.
+        """
+        return hashlib.md5(hash_pandas_object(column, index=False).values).hexdigest()
+
+    @classmethod
+    def _column_hashes(cls, df):
+        """
+        Digests for all columns of a dataframe, so that changes can be detected
+        column by column instead of serializing the whole dataframe.
+
+        :param df: `pd.DataFrame`.
+        :return: tuple of (column name, digest) tuples.
+        """
+        return tuple((name, cls._column_hash(df.iloc[:, i])) for i, name in enumerate(df.columns))
+
     def __hash__(self):
-        return hash(self.df.__bytes__())
+        return hash(self._column_hashes(self.df))
 
     @property
     def df_has_changed(self):
-        if not self._hash_init:
+        """
+        True if the dataframe has been changed since it has been loaded from disk,
+        or if it has been set without loading it from disk. Stops comparing
+        at the first changed column.
+        """
+        if not self.df_is_loaded:
             return False
-        else:
-            return hash(self) != self._hash_init
+
+        initial = self._column_hashes_init
+        if initial is None or len(initial) != self.df.shape[1] or \
+                any(name != initial_name for name, (initial_name, _) in zip(self.df.columns, initial)):
+            return True
+
+        return any(self._column_hash(self.df.iloc[:, i]) != digest for i, (_, digest) in enumerate(initial))
 
     @property
     def header(self):
+        """
+        Column names of this file. If the dataframe has not been loaded yet, only
+        the first line of the file is read.
+        """
+        if self._read_lazily:
+            return self._lazy_read('header', lambda: file2df(self.path, nrows=0).columns)
         return self.df.columns
 
+    def _lazy_read(self, key, read):
+        """
+        Result of reading part of the file, cached until the path, modification
+        time or size of the file changes.
+
+        :param key: identifies what is read.
+        :param read: function that reads it from the file.
+        """
+        stat = os.stat(self.path)
+        state = self.path, stat.st_mtime_ns, stat.st_size
+        if self._lazy_reads is None or self._lazy_reads[0] != state:
+            self._lazy_reads = state, {}
+        reads = self._lazy_reads[1]
+        if key not in reads:
+            reads[key] = read()
+        return reads[key]
+
+    @property
+    def _read_lazily(self):
+        """True if data can be read from file instead of the (not yet loaded) dataframe."""
+        if self.df_is_loaded or not self.path or not os.path.exists(self.path):
+            return False
+
+        def has_tab():
+            with open(self.path, 'r') as file:
+                return '\t' in file.readline()
+        return self._lazy_read('has_tab', has_tab)
+
+    def get_column(self, column):
+        """
+        Get a single column by position or by name. If the dataframe has not
+        been loaded yet, only this column is read from the file and the full
+        dataframe is not loaded. Columns read this way are kept until the file
+        changes. Files with post load modifications (_df_mods) are always loaded
+        in full, so these are applied.
+
+        :param column: column index (int) or column name (str).
+        :return: `pd.Series`.
+        """
+        if self._read_lazily and not hasattr(self, '_df_mods'):
+            return self._lazy_read(('column', column),
+                                   lambda: file2df(self.path, usecols=[column]).iloc[:, 0])
+        elif isinstance(column, int):
+            return self.df.iloc[:, column]
+        else:
+            return self.df.loc[:, column]
+
     @property
     def name(self):
         return os.path.basename(self.path)
@@ -96,8 +233,52 @@ class FileBase:
 
         :param path: path to write file to.
         :param overwrite: write over existing files in the filesystem)
+        :return: `WriteStats` with number of rows and bytes written.
+        """
+        return df2file(self.df, path, overwrite=overwrite, path_columns=self._path_columns)
+
+    @property
+    def file_is_current(self):
+        """
+        True if the file on disk holds the current data, i.e. the file exists
+        and the dataframe has not been loaded, or has not been changed since.
+        """
+        return bool(self.path) and os.path.isfile(self.path) and not self.df_has_changed
+
+    def copy_to(self, path, overwrite=False, link=False):
         """
-        df2file(self.df, path, overwrite=overwrite)
+        Copy the file on disk to path without loading the dataframe. Only
+        reflects the current data if :attr:`file_is_current`.
+
+        :param path: path to copy file to.
+        :param overwrite: write over existing files in the filesystem.
+        :param link: if True, create a hard link instead of a copy if possible.
+        :return: `WriteStats` with number of bytes copied, rows are not counted.
+        """
+        if not overwrite and os.path.exists(path):
+            raise PathError("{} already exists. Consider setting `overwrite=True`".format(path))
+
+        if os.path.exists(path) and os.path.samefile(self.path, path):
+            return WriteStats(None, os.path.getsize(path))
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+        try:
+            if link:
+                try:
+                    os.link(self.path, tmp_path)
+                except OSError:
+                    # Linking across devices or not supported by the file system.
+                    link = False
+            if not link:
+                shutil.copy2(self.path, tmp_path)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        return WriteStats(None, os.path.getsize(path))
 
     def save(self):
         """Overwrite the original file with the current dataframe."""
@@ -0,0 +1,203 @@
+from collections import defaultdict
+from itertools import count
+
+from .filebase import FileBase
+from .validate import ValidateMixin
+
+
+class Registry:
+    """
+    Index of the file, params and container objects that belong to a study.
+    Objects are added and removed by the containers that hold them, see
+    `RegistryMixin`, so lookups do not require walking through all objects.
+
+    Objects can be looked up by type and by the attributes in INDEXED_ATTRIBUTES.
+    Objects that are held by multiple containers are counted, and only
+    removed when the last container lets go of them.
+
+    Indexed attributes can change after objects have been added, e.g. renamed
+    files. Lookups that find nothing in the index fall back to checking all
+    objects, and objects found that way are added to the index.
+    """
+
+    INDEXED_ATTRIBUTES = ('datatype', 'platform', 'name', 'path')
+
+    def __init__(self):
+        self._entries = {}
+        self._by_type = defaultdict(dict)
+        self._by_attribute = {attribute: defaultdict(dict) for attribute in self.INDEXED_ATTRIBUTES}
+        self._sequence = count()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __iter__(self):
+        return (entry[0] for entry in self._entries.values())
+
+    def __contains__(self, obj):
+        return id(obj) in self._entries
+
+    @staticmethod
+    def registrable(obj):
+        """ True for objects that are kept in a registry. """
+        return isinstance(obj, (FileBase, ValidateMixin, RegistryMixin))
+
+    @staticmethod
+    def _attribute(obj, attribute):
+        try:
+            value = getattr(obj, attribute, None)
+        except Exception:
+            return
+        return value if isinstance(value, str) else None
+
+    def add(self, obj):
+        """
+        Add object to the registry, or increase its count if it is already present.
+
+        :param obj: object to add.
+        """
+        key = id(obj)
+        if key in self._entries:
+            self._entries[key][1] += 1
+            return
+
+        self._entries[key] = [obj, 1, next(self._sequence)]
+        for type_ in type(obj).__mro__:
+            self._by_type[type_][key] = obj
+        for attribute, index in self._by_attribute.items():
+            value = self._attribute(obj, attribute)
+            if value is not None:
+                index[value][key] = obj
+
+    def remove(self, obj):
+        """
+        Decrease the count of an object and remove it once no container holds it.
+
+        :param obj: object to remove.
+        """
+        key = id(obj)
+        entry = self._entries.get(key)
+        if entry is None:
+            return
+
+        entry[1] -= 1
+        if entry[1] > 0:
+            return
+
+        del self._entries[key]
+        for type_ in type(obj).__mro__:
+            self._by_type[type_].pop(key, None)
+        for index in self._by_attribute.values():
+            for objects in index.values():
+                objects.pop(key, None)
+
+    def _ordered(self, objects):
+        return sorted(objects, key=lambda obj: self._entries[id(obj)][2])
+
+    def of_type(self, of_type):
+        """
+        All objects that are an instance of a type, in order of registration.
+
+        :param of_type: type to match against.
+        :return: list of objects.
+        """
+        return self._ordered(self._by_type.get(of_type, {}).values())
+
+    def find(self, attribute, *values, of_type=object):
+        """
+        Objects of a type that have an attribute with any of the given values, in
+        order of registration. If nothing is found in the index, all objects are
+        checked, as attributes can have changed after objects were added.
+
+        :param attribute: one of INDEXED_ATTRIBUTES.
+        :param values: values to look for.
+        :param of_type: type to match against.
+        :return: list of objects.
+        """
+        def matches():
+            index = self._by_attribute[attribute]
+            return [obj for value in set(values) for obj in index.get(value, {}).values()
+                    if isinstance(obj, of_type) and self._attribute(obj, attribute) == value]
+
+        found = matches()
+        if not found:
+            found = self._scan(attribute, set(values), of_type)
+        return self._ordered(found)
+
+    def _scan(self, attribute, values, of_type):
+        """ Check all objects for attribute values and add those found to the index. """
+        index = self._by_attribute[attribute]
+        found = []
+        for key, (obj, _, _) in self._entries.items():
+            value = self._attribute(obj, attribute)
+            if value in values and isinstance(obj, of_type):
+                index[value][key] = obj
+                found.append(obj)
+        return found
+
+
+class RegistryMixin:
+    """
+    Mixin for container classes. File, params and container objects that are set
+    as attribute are added to the registry of the container, and removed when
+    they are replaced or deleted. Containers set on another container share its
+    registry, so the registry of a `tmtk.Study` holds all of its objects.
+    """
+
+    # Attributes that refer to other objects than children.
+    _unregistered_attributes = ('parent', '_parent', 'msgs', '_registry')
+
+    @property
+    def registry(self):
+        """ `Registry` with all objects in this container, created on first request. """
+        if self.__dict__.get('_registry') is None:
+            self._attach_registry(Registry())
+        return self.__dict__['_registry']
+
+    def _children(self):
+        return [value for key, value in self.__dict__.items()
+                if key not in self._unregistered_attributes and Registry.registrable(value)]
+
+    def _attach_registry(self, registry):
+        if self.__dict__.get('_registry') is registry:
+            return
+        self.__dict__['_registry'] = registry
+        for child in self._children():
+            self._register(child)
+
+    def _register(self, obj):
+        registry = self.__dict__['_registry']
+        registry.add(obj)
+        if isinstance(obj, RegistryMixin):
+            obj._attach_registry(registry)
+
+    def _unregister(self, obj):
+        registry = self.__dict__['_registry']
+        registry.remove(obj)
+        if isinstance(obj, RegistryMixin) and obj not in registry:
+            for child in obj._children():
+                obj._unregister(child)
+            obj.__dict__['_registry'] = None
+
+    def __setattr__(self, key, value):
+        old = self.__dict__.get(key)
+        super().__setattr__(key, value)
+
+        if self.__dict__.get('_registry') is None or key in self._unregistered_attributes:
+            return
+
+        # Properties store their value under a different name, it is registered there.
+        if self.__dict__.get(key) is not value or old is value:
+            return
+
+        if Registry.registrable(old):
+            self._unregister(old)
+        if Registry.registrable(value):
+            self._register(value)
+
+    def __delattr__(self, key):
+        old = self.__dict__.get(key)
+        super().__delattr__(key)
+        if self.__dict__.get('_registry') is not None and key not in self._unregistered_attributes \
+                and Registry.registrable(old):
+            self._unregister(old)